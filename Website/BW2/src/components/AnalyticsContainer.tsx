@@ -90,6 +90,19 @@ export const AnalyticsContainer: React.FC = () => {
     };
 
     fetchData();
+
+    // The backend pushes fresh analytics whenever the browsing history changes
+    const events = new EventSource(`${BACKEND_URL}/api/browsing_analytics/stream`);
+    events.addEventListener('analytics', (event) => {
+      try {
+        setData(JSON.parse((event as MessageEvent).data));
+        setError(null);
+      } catch (err) {
+        console.error('Error reading analytics update:', err);
+      }
+    });
+
+    return () => events.close();
   }, []);
 
   if (loading) {
@@ -0,0 +1 @@
+"""Code shared by the url_scraping and dex-mcp-upstream services."""
@@ -0,0 +1,134 @@
+"""Website categories used to group browsing history in analytics."""
+
+import json
+import os
+import threading
+import zlib
+from collections import deque
+from functools import lru_cache
+
+# Rules live in a data file so categories can be tuned without code changes
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'category_rules.json')
+
+# Characters that separate the labels of a domain name
+LABEL_SEPARATORS = '.-'
+
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton: finds every occurrence of every keyword in one pass over a string"""
+
+    def __init__(self, keywords):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for index, keyword in enumerate(keywords):
+            state = 0
+            for char in keyword:
+                if char not in self._goto[state]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                    self._goto[state][char] = len(self._goto) - 1
+                state = self._goto[state][char]
+            self._out[state].append(index)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def matches(self, text: str):
+        """(end position, keyword index) for each keyword occurrence in ``text``"""
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for index in self._out[state]:
+                yield position, index
+
+
+class Categorizer:
+    """Categorizes domains with rules compiled into a single keyword automaton.
+
+    ``rules`` is the parsed rules file: ``categories`` in priority order,
+    each with ``keywords`` matched anywhere in the domain and ``labels``
+    matched only as whole labels (so "ap" matches ap.org but not apple.com),
+    optionally ``search_urls_only``; ``overrides`` mapping exact domains to
+    a category; and the ``default`` category. Results are cached per domain.
+    """
+
+    def __init__(self, rules: dict, cache_size: int = 65536):
+        self.default = rules.get('default', 'Other')
+        self.overrides = {domain.lower(): category for domain, category in rules.get('overrides', {}).items()}
+        self._names = []
+        self._search_only = []
+        self._keywords = []  # (length, category rank, whole label only)
+        patterns = []
+        for rank, category in enumerate(rules.get('categories', [])):
+            self._names.append(category['name'])
+            self._search_only.append(bool(category.get('search_urls_only')))
+            for whole_label, key in ((False, 'keywords'), (True, 'labels')):
+                for keyword in category.get(key, []):
+                    patterns.append(keyword.lower())
+                    self._keywords.append((len(keyword), rank, whole_label))
+        self._automaton = KeywordAutomaton(patterns)
+        # Identifies the rules, so stored categories can be recomputed when they change
+        self.fingerprint = zlib.crc32(json.dumps(rules, sort_keys=True).encode('utf-8'))
+        self._categorize_cached = lru_cache(maxsize=cache_size)(self._categorize)
+
+    @classmethod
+    def from_file(cls, path: str = DEFAULT_RULES_PATH, **kwargs):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f), **kwargs)
+
+    def categorize(self, domain: str, url: str = '') -> str:
+        """Category of a domain; ``url`` only decides whether it was a search"""
+        url_lower = url.lower()
+        return self._categorize_cached(domain.lower(), 'search' in url_lower or 'q=' in url_lower)
+
+    def _categorize(self, domain: str, search_url: bool) -> str:
+        if domain in self.overrides:
+            return self.overrides[domain]
+        best = None
+        for end, index in self._automaton.matches(domain):
+            length, rank, whole_label = self._keywords[index]
+            if best is not None and rank >= best:
+                continue
+            if self._search_only[rank] and not search_url:
+                continue
+            if whole_label:
+                start = end - length + 1
+                if ((start > 0 and domain[start - 1] not in LABEL_SEPARATORS)
+                        or (end + 1 < len(domain) and domain[end + 1] not in LABEL_SEPARATORS)):
+                    continue
+            best = rank
+        return self.default if best is None else self._names[best]
+
+
+_categorizer = None
+_categorizer_lock = threading.Lock()
+
+
+def get_categorizer() -> Categorizer:
+    """The shared categorizer, loaded on first use from $BROWSEIQ_CATEGORY_RULES or the bundled rules"""
+    global _categorizer
+    if _categorizer is None:
+        with _categorizer_lock:
+            if _categorizer is None:
+                _categorizer = Categorizer.from_file(os.getenv("BROWSEIQ_CATEGORY_RULES", DEFAULT_RULES_PATH))
+    return _categorizer
+
+
+def categorize_domain(domain: str, url: str = '', content: str = '') -> str:
+    """Categorize a domain based on its name and whether ``url`` is a search.
+
+    ``content`` is accepted for existing callers but not used.
+    """
+    return get_categorizer().categorize(domain, url)
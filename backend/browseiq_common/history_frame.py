@@ -0,0 +1,152 @@
+"""Columnar (NumPy) analytics over any time window of the history store."""
+
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from browseiq_common.categories import categorize_domain
+
+
+def window_bound(value, end: bool = False):
+    """ms since the epoch for a window bound (a datetime or ISO string), or None
+
+    A bare end date covers that whole day, so it is inclusive. Datetimes
+    without a timezone are taken as UTC.
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        parsed = datetime.fromisoformat(value)
+        if end and len(value) == 10:
+            parsed += timedelta(days=1)
+    else:
+        parsed = value
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp() * 1000)
+
+
+class HistoryFrame:
+    """The store's visits as NumPy columns sorted by visit time, for analytics
+    over arbitrary time windows.
+
+    Each URL's domain, category and canonical page are turned into integer
+    codes once, when the URL is first loaded, so a window query is a pair
+    of binary searches and a few ``np.bincount`` group-bys. Like the date
+    index, the frame is loaded once and then refreshed with just the
+    visits written since (a full reload only if existing visits changed).
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._version_conn = sqlite3.connect(store.path, check_same_thread=False)
+        self._data_version = None
+        self._reset()
+
+    def _reset(self):
+        self.revision = -1
+        self._max_visit_id = 0
+        # Visit columns, sorted by visit time
+        self._times = np.empty(0, dtype=np.int64)
+        self._url_ids = np.empty(0, dtype=np.int64)
+        self._counts = np.empty(0, dtype=np.int64)
+        # URL columns, indexed by URL id (ids never visited keep code 0 and are never read)
+        self._url_domain = np.zeros(1, dtype=np.int64)
+        self._url_category = np.zeros(1, dtype=np.int64)
+        self._url_page = np.zeros(1, dtype=np.int64)
+        self._page_domain = np.empty(0, dtype=np.int64)
+        # Names -> codes, in the order first seen
+        self._domains, self._categories, self._pages = {}, {}, {}
+
+    def refresh(self) -> int:
+        """Load visits written since the last refresh, returning how many"""
+        with self._lock:
+            data_version = self._version_conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version == self._data_version:
+                return 0
+            rows, revision = self.store.visit_records(self.revision)
+            if rows and self._max_visit_id and min(row[0] for row in rows) <= self._max_visit_id:
+                # Visits already loaded have changed; their positions are not tracked, so start over
+                self._reset()
+                rows, revision = self.store.visit_records(self.revision)
+            self._load_urls()
+            if rows:
+                self._append(np.array(rows, dtype=np.int64))
+            self.revision = revision
+            self._data_version = data_version
+            return len(rows)
+
+    def _load_urls(self):
+        rows = self.store.url_records(len(self._url_domain) - 1)
+        if not rows:
+            return
+        size = rows[-1][0] + 1
+        for name in ('_url_domain', '_url_category', '_url_page'):
+            column = np.zeros(size, dtype=np.int64)
+            column[:len(getattr(self, name))] = getattr(self, name)
+            setattr(self, name, column)
+        page_domain = []
+        for url_id, canonical_url, domain, category in rows:
+            domain_code = self._domains.setdefault(domain, len(self._domains))
+            if canonical_url not in self._pages:
+                self._pages[canonical_url] = len(self._pages)
+                page_domain.append(domain_code)
+            self._url_domain[url_id] = domain_code
+            self._url_category[url_id] = self._categories.setdefault(category, len(self._categories))
+            self._url_page[url_id] = self._pages[canonical_url]
+        self._page_domain = np.concatenate([self._page_domain, np.array(page_domain, dtype=np.int64)])
+
+    def _append(self, rows: np.ndarray):
+        visit_ids, url_ids, times, counts = rows.T
+        self._max_visit_id = max(self._max_visit_id, int(visit_ids.max()))
+        order = np.argsort(times, kind='stable')
+        times, url_ids, counts = times[order], url_ids[order], counts[order]
+        if len(self._times) and times[0] < self._times[-1]:
+            # Older than what is loaded (e.g. an import): merge, keeping the columns sorted
+            times = np.concatenate([self._times, times])
+            order = np.argsort(times, kind='stable')
+            self._times = times[order]
+            self._url_ids = np.concatenate([self._url_ids, url_ids])[order]
+            self._counts = np.concatenate([self._counts, counts])[order]
+        else:
+            self._times = np.concatenate([self._times, times])
+            self._url_ids = np.concatenate([self._url_ids, url_ids])
+            self._counts = np.concatenate([self._counts, counts])
+
+    def window_totals(self, start=None, end=None, top_domains: int = 15):
+        """Analytics totals for visits in [start, end), in the shapes the store's
+        running totals use: the top domains (dicts with domain, category,
+        visits, unique_pages) and (category, visits) pairs, most visited first.
+
+        ``start`` and ``end`` are datetimes or ISO strings (see window_bound);
+        None leaves that end open. Ties keep the order in which domains and
+        categories were first recorded, as the running totals do.
+        """
+        self.refresh()
+        start_ms, end_ms = window_bound(start), window_bound(end, end=True)
+        with self._lock:
+            lo = 0 if start_ms is None else np.searchsorted(self._times, start_ms, side='left')
+            hi = len(self._times) if end_ms is None else np.searchsorted(self._times, end_ms, side='left')
+            per_url = np.bincount(self._url_ids[lo:hi], weights=self._counts[lo:hi],
+                                  minlength=len(self._url_domain)).astype(np.int64)
+            visited = np.flatnonzero(per_url)
+            domain_visits = np.bincount(self._url_domain[visited], weights=per_url[visited],
+                                        minlength=len(self._domains)).astype(np.int64)
+            pages = np.unique(self._url_page[visited])
+            unique_pages = np.bincount(self._page_domain[pages], minlength=len(self._domains))
+            category_visits = np.bincount(self._url_category[visited], weights=per_url[visited],
+                                          minlength=len(self._categories)).astype(np.int64)
+            domain_names = list(self._domains)
+            category_names = list(self._categories)
+
+        # Stable sorts on the negated counts keep first-seen order among ties
+        top = [code for code in np.argsort(-domain_visits, kind='stable')[:top_domains] if domain_visits[code]]
+        domains = [{'domain': domain_names[code], 'category': categorize_domain(domain_names[code]),
+                    'visits': int(domain_visits[code]), 'unique_pages': int(unique_pages[code])}
+                   for code in top]
+        categories = [(category_names[code], int(category_visits[code]))
+                      for code in np.argsort(-category_visits, kind='stable') if category_visits[code]]
+        return domains, categories
@@ -0,0 +1,51 @@
+"""In-memory index of history visits by date, kept in step with the history store."""
+
+import bisect
+import sqlite3
+import threading
+
+
+class HistoryDateIndex:
+    """Visits grouped by UTC date, for date-range queries.
+
+    Built once from the store, then refreshed incrementally: every query
+    first checks SQLite's data_version (a cheap per-connection counter that
+    moves when any other connection commits) and, only if it moved, pulls
+    the visits added or changed since the last revision seen. A query is
+    a bisect over the sorted date keys.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.revision = -1
+        self._days = {}  # date -> {visit_id: visit}, in recorded order
+        self._dates = []  # sorted keys of _days
+        self._lock = threading.Lock()
+        # Only used to notice commits made through the store's other connections
+        self._version_conn = sqlite3.connect(store.path, check_same_thread=False)
+        self._data_version = None
+
+    def refresh(self) -> int:
+        """Pull visits added or changed since the last refresh, returning how many"""
+        with self._lock:
+            data_version = self._version_conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version == self._data_version:
+                return 0
+            visits, revision = self.store.visits_since(self.revision)
+            for visit in visits:
+                day = visit['visit_date']
+                if day not in self._days:
+                    self._days[day] = {}
+                    bisect.insort(self._dates, day)
+                self._days[day][visit.pop('visit_id')] = visit
+            self.revision = revision
+            self._data_version = data_version
+            return len(visits)
+
+    def visits_between(self, start_date: str, end_date: str):
+        """Visits from ``start_date`` to ``end_date`` (inclusive), oldest date first"""
+        self.refresh()
+        with self._lock:
+            start = bisect.bisect_left(self._dates, start_date)
+            end = bisect.bisect_right(self._dates, end_date)
+            return [visit for day in self._dates[start:end] for visit in self._days[day].values()]
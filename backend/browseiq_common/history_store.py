@@ -0,0 +1,724 @@
+"""Browser history, kept in an indexed SQLite database shared by both services."""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta, timezone
+from urllib.parse import parse_qs, urlsplit
+
+from browseiq_common.categories import categorize_domain, get_categorizer
+from browseiq_common.urls import canonical_domain, canonical_host, canonicalize_url, is_valid_url
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+DEFAULT_DB_PATH = os.path.join(DATA_DIR, 'history.db')
+# Processed history export the store replaces; imported when the store is empty
+LEGACY_CONTENTS_PATH = os.path.join(DATA_DIR, 'contents.json')
+
+HOUR_MS = 3600 * 1000
+DAY_MS = 24 * HOUR_MS
+WEEK_MS = 7 * DAY_MS
+# Rollup bucket sizes, coarsest first; weeks are ISO weeks (Monday to Sunday, UTC)
+ROLLUP_GRANULARITIES = ('week', 'day', 'hour')
+# Stands in for an open end of a time range
+END_OF_TIME = 2 ** 53
+# A search ranks at most this many matching pages, the most recently first seen
+SEARCH_CANDIDATES = 200
+# Words too common to narrow a search; left out of queries unless quoted in a phrase
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'but', 'by', 'can', 'did', 'do', 'for', 'from', 'had', 'has',
+    'have', 'how', 'i', 'if', 'in', 'into', 'is', 'it', 'its', 'me', 'my', 'no', 'not', 'of', 'on', 'or',
+    'our', 'so', 'that', 'the', 'their', 'then', 'there', 'these', 'they', 'this', 'to', 'was', 'we',
+    'were', 'what', 'when', 'where', 'which', 'who', 'why', 'will', 'with', 'you', 'your'
+}
+
+# Search engine (host label) -> query parameter holding the search terms
+SEARCH_ENGINES = {'google': 'q', 'bing': 'q', 'duckduckgo': 'q', 'yahoo': 'p'}
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS urls (
+        id INTEGER PRIMARY KEY,
+        url TEXT NOT NULL UNIQUE,
+        canonical_url TEXT NOT NULL,
+        domain TEXT NOT NULL,
+        category TEXT NOT NULL,
+        title TEXT,
+        visit_count INTEGER NOT NULL DEFAULT 0,
+        last_visit_time INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_urls_canonical ON urls(canonical_url);
+    CREATE INDEX IF NOT EXISTS idx_urls_domain ON urls(domain);
+    CREATE INDEX IF NOT EXISTS idx_urls_category ON urls(category);
+
+    CREATE TABLE IF NOT EXISTS visits (
+        id INTEGER PRIMARY KEY,
+        url_id INTEGER NOT NULL REFERENCES urls(id),
+        visit_time INTEGER NOT NULL,
+        visit_date TEXT NOT NULL,
+        visit_count INTEGER NOT NULL DEFAULT 1,
+        revision INTEGER NOT NULL DEFAULT 0,
+        UNIQUE (url_id, visit_time)
+    );
+    CREATE INDEX IF NOT EXISTS idx_visits_date ON visits(visit_date);
+    CREATE INDEX IF NOT EXISTS idx_visits_revision ON visits(revision);
+
+    -- Bumped by every write that adds or changes visits, so readers can pull just the changes
+    CREATE TABLE IF NOT EXISTS store_meta (
+        key TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    );
+    INSERT OR IGNORE INTO store_meta (key, value) VALUES ('revision', 0);
+
+    -- Running analytics totals, updated with the deltas of every write
+    CREATE TABLE IF NOT EXISTS domain_stats (
+        id INTEGER PRIMARY KEY,
+        domain TEXT NOT NULL UNIQUE,
+        category TEXT NOT NULL,
+        visits INTEGER NOT NULL DEFAULT 0,
+        unique_pages INTEGER NOT NULL DEFAULT 0,
+        first_visit INTEGER,
+        last_visit INTEGER
+    );
+    CREATE INDEX IF NOT EXISTS idx_domain_stats_visits ON domain_stats(visits DESC, id);
+
+    CREATE TABLE IF NOT EXISTS category_stats (
+        id INTEGER PRIMARY KEY,
+        category TEXT NOT NULL UNIQUE,
+        visits INTEGER NOT NULL DEFAULT 0
+    );
+
+    -- Visits per time bucket (hour, day and ISO week, by UTC start time in ms), domain and category
+    CREATE TABLE IF NOT EXISTS rollups (
+        granularity TEXT NOT NULL,
+        bucket INTEGER NOT NULL,
+        domain TEXT NOT NULL,
+        category TEXT NOT NULL,
+        visits INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (granularity, bucket, domain, category)
+    ) WITHOUT ROWID;
+
+    CREATE TABLE IF NOT EXISTS content (
+        url_id INTEGER PRIMARY KEY REFERENCES urls(id),
+        content TEXT NOT NULL,
+        updated_at INTEGER NOT NULL
+    );
+
+    -- Full-text index with one row per page (canonical URL), keyed by the id of its first stored URL;
+    -- visited holds a dYYYYMMDD, mYYYYMM and yYYYY token per visit date, for date filters
+    CREATE VIRTUAL TABLE IF NOT EXISTS page_search USING fts5(
+        url, title, content, visited, tokenize = 'porter unicode61 remove_diacritics 2'
+    );
+
+    CREATE TABLE IF NOT EXISTS search_terms (
+        url_id INTEGER NOT NULL REFERENCES urls(id),
+        term TEXT NOT NULL,
+        normalized_term TEXT NOT NULL,
+        PRIMARY KEY (url_id, normalized_term)
+    );
+    CREATE INDEX IF NOT EXISTS idx_search_terms_normalized ON search_terms(normalized_term);
+"""
+
+
+def visit_date(visit_time: int) -> str:
+    """UTC date (YYYY-MM-DD) of a visit time in ms since the epoch"""
+    return datetime.fromtimestamp(visit_time / 1000, timezone.utc).date().isoformat()
+
+
+def now_ms() -> int:
+    return int(datetime.now(timezone.utc).timestamp() * 1000)
+
+
+def bucket_start(granularity: str, time: int) -> int:
+    """Start (ms since the epoch) of the UTC hour, day or ISO week containing ``time``"""
+    if granularity == 'hour':
+        return time - time % HOUR_MS
+    day = time // DAY_MS
+    if granularity == 'day':
+        return day * DAY_MS
+    # The epoch fell on a Thursday, three days after the Monday that starts its week
+    return (day - (day + 3) % 7) * DAY_MS
+
+
+def rollup_spans(start: int, end: int, level: int = 0):
+    """Cover [start, end) (whole hours) with the fewest buckets: (granularity,
+    first bucket, end) spans, whole weeks in the middle and days and hours
+    only at the edges, so a range costs O(buckets) however long it is"""
+    granularity = ROLLUP_GRANULARITIES[level]
+    if granularity == 'hour':
+        return [(granularity, start, end)] if start < end else []
+    size = WEEK_MS if granularity == 'week' else DAY_MS
+    first = bucket_start(granularity, start)
+    if first < start:
+        first += size
+    last = bucket_start(granularity, end)
+    if first >= last:
+        return rollup_spans(start, end, level + 1)
+    return rollup_spans(start, first, level + 1) + [(granularity, first, last)] + rollup_spans(last, end, level + 1)
+
+
+def fts_query(text: str) -> str:
+    """FTS5 query for search box text: "quoted phrases" match as phrases, every
+    other word must appear (bar STOPWORDS, unless there is nothing else), and a
+    word ending in * matches as a prefix"""
+    parts, stopwords = [], []
+    for phrase, word in re.findall(r'"([^"]*)"?|(\S+)', text):
+        tokens = re.findall(r'\w+', phrase or word)
+        if not tokens:
+            continue
+        part = '"' + ' '.join(tokens) + '"' + ('*' if word.endswith('*') else '')
+        if not phrase and len(tokens) == 1 and tokens[0].lower() in STOPWORDS and not word.endswith('*'):
+            stopwords.append(part)
+        else:
+            parts.append(part)
+    if not parts and not stopwords:
+        raise ValueError("Nothing to search for")
+    return ' '.join(parts or stopwords)
+
+
+def visited_tokens(first: date, last: date):
+    """page_search ``visited`` tokens covering the dates first..last (inclusive):
+    whole years and months as one token each, the remaining days one by one"""
+    tokens, day = [], first
+    while day <= last:
+        if day.month == 1 and day.day == 1 and date(day.year, 12, 31) <= last:
+            tokens.append(f"y{day.year}")
+            day = date(day.year + 1, 1, 1)
+            continue
+        next_month = date(day.year + day.month // 12, day.month % 12 + 1, 1)
+        if day.day == 1 and next_month - timedelta(days=1) <= last:
+            tokens.append(f"m{day:%Y%m}")
+            day = next_month
+            continue
+        tokens.append(f"d{day:%Y%m%d}")
+        day += timedelta(days=1)
+    return tokens
+
+
+def search_term(url: str):
+    """Terms searched for in a search engine results URL, or None"""
+    try:
+        parts = urlsplit(url)
+        labels = canonical_host(parts.hostname or '').split('.')
+    except ValueError:
+        return None
+    for engine, param in SEARCH_ENGINES.items():
+        if engine in labels:
+            terms = parse_qs(parts.query).get(param)
+            return terms[0].strip() or None if terms else None
+    return None
+
+
+class HistoryStore:
+    """Repository for browsing history: URLs, their visits, page content and search terms.
+
+    The database runs in WAL mode, so readers (including other processes,
+    such as the MCP server) never block the writer or each other. Writes go
+    through one connection; each reading thread gets its own. Every query is
+    served from an index, so reads cost what they return rather than the
+    size of the history.
+
+    Visits are recorded as rows of ``visit_count`` visits, the latest at
+    ``visit_time``, which is all the extension reports between posts.
+    """
+
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._recategorize()
+        self._conn.commit()
+
+    def _rebuild_rollups(self):
+        self._conn.execute("DELETE FROM rollups")
+        self._conn.execute(
+            f"""INSERT INTO rollups (granularity, bucket, domain, category, visits)
+                SELECT 'hour', v.visit_time - v.visit_time % {HOUR_MS}, u.domain, u.category, SUM(v.visit_count)
+                FROM visits v JOIN urls u ON u.id = v.url_id
+                GROUP BY 2, 3, 4"""
+        )
+        # Days and weeks from the hours (see bucket_start)
+        for granularity, bucket in (('day', f"bucket / {DAY_MS} * {DAY_MS}"),
+                                    ('week', f"(bucket / {DAY_MS} - (bucket / {DAY_MS} + 3) % 7) * {DAY_MS}")):
+            self._conn.execute(
+                f"""INSERT INTO rollups (granularity, bucket, domain, category, visits)
+                    SELECT '{granularity}', {bucket}, domain, category, SUM(visits)
+                    FROM rollups WHERE granularity = 'hour'
+                    GROUP BY 2, 3, 4"""
+            )
+
+    def _recategorize(self):
+        # Categories are stored per URL; recompute them (and their totals) when the rules change
+        fingerprint = get_categorizer().fingerprint
+        stored = self._conn.execute("SELECT value FROM store_meta WHERE key = 'category_rules'").fetchone()
+        if stored and stored[0] == fingerprint:
+            return
+        changed = [(category, url_id) for url_id, domain, canonical, old in self._conn.execute(
+            "SELECT id, domain, canonical_url, category FROM urls"
+        ) for category in (categorize_domain(domain, canonical),) if category != old]
+        if changed:
+            self._conn.executemany("UPDATE urls SET category = ? WHERE id = ?", changed)
+            self._conn.executemany(
+                "UPDATE domain_stats SET category = ? WHERE id = ?",
+                [(categorize_domain(domain), stats_id)
+                 for stats_id, domain in self._conn.execute("SELECT id, domain FROM domain_stats")]
+            )
+            self._conn.execute("DELETE FROM category_stats")
+            self._conn.execute(
+                """INSERT INTO category_stats (category, visits)
+                   SELECT u.category, SUM(v.visit_count) FROM visits v JOIN urls u ON u.id = v.url_id
+                   GROUP BY u.category ORDER BY MIN(u.id)"""
+            )
+            self._rebuild_rollups()
+        self._conn.execute("INSERT OR REPLACE INTO store_meta (key, value) VALUES ('category_rules', ?)",
+                           (fingerprint,))
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path)
+            conn.row_factory = sqlite3.Row
+        return conn
+
+    def _url_ids(self, urls) -> dict:
+        placeholders = ', '.join('?' * len(urls))
+        return dict(self._conn.execute(f"SELECT url, id FROM urls WHERE url IN ({placeholders})", list(urls)))
+
+    def _record_visits(self, visits) -> set:
+        """Upsert (url, visit_time, title, visit_count) rows, returning the
+        canonical URLs of pages that are new, retitled or visited on a new date
+        (see _index_pages); call with the write lock held"""
+        if not visits:
+            return set()
+        rows = []
+        for url, time, title, count in visits:
+            canonical = canonicalize_url(url)
+            domain = canonical_domain(canonical)
+            rows.append((url, canonical, domain, categorize_domain(domain, canonical), time, count, title))
+        placeholders = ', '.join('?' * len(rows))
+        known_pages = {canonical for canonical, in self._conn.execute(
+            f"SELECT DISTINCT canonical_url FROM urls WHERE canonical_url IN ({placeholders})",
+            [row[1] for row in rows]
+        )}
+        titles = dict(self._conn.execute(
+            f"SELECT url, title FROM urls WHERE url IN ({placeholders})", [row[0] for row in rows]))
+        dates = {visit_date(row[4]) for row in rows}
+        page_dates = set(self._conn.execute(
+            f"""SELECT DISTINCT u.canonical_url, v.visit_date FROM urls u JOIN visits v ON v.url_id = u.id
+                WHERE u.canonical_url IN ({placeholders}) AND v.visit_date IN ({', '.join('?' * len(dates))})""",
+            [row[1] for row in rows] + list(dates)
+        ))
+        changed_pages = {canonical for url, canonical, _, _, time, _, title in rows
+                         if canonical not in known_pages or (title and title != titles.get(url))
+                         or (canonical, visit_date(time)) not in page_dates}
+        self._conn.executemany(
+            """INSERT INTO urls (url, canonical_url, domain, category, title, visit_count, last_visit_time)
+               VALUES (?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT(url) DO UPDATE SET
+                   title = COALESCE(excluded.title, title),
+                   visit_count = visit_count + excluded.visit_count,
+                   last_visit_time = MAX(last_visit_time, excluded.last_visit_time)""",
+            [(url, canonical, domain, category, title, count, time)
+             for url, canonical, domain, category, time, count, title in rows]
+        )
+        self._update_analytics([row[:6] for row in rows], known_pages)
+        self._update_rollups([row[2:6] for row in rows])
+        ids = self._url_ids({visit[0] for visit in visits})
+        revision = self._conn.execute(
+            "UPDATE store_meta SET value = value + 1 WHERE key = 'revision' RETURNING value").fetchone()[0]
+        self._conn.executemany(
+            """INSERT INTO visits (url_id, visit_time, visit_date, visit_count, revision) VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT(url_id, visit_time) DO UPDATE SET
+                   visit_count = visit_count + excluded.visit_count, revision = excluded.revision""",
+            [(ids[url], time, visit_date(time), count, revision) for url, time, _, count in visits]
+        )
+        terms = {(ids[url], term) for url, *_ in visits for term in (search_term(url),) if term}
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO search_terms (url_id, term, normalized_term) VALUES (?, ?, ?)",
+            [(url_id, term, ' '.join(term.lower().split())) for url_id, term in terms]
+        )
+        return changed_pages
+
+    # Each page's search row: its canonical URL, latest title, latest content and visit dates
+    PAGE_SEARCH_ROWS = """
+        SELECT MIN(u.id), u.canonical_url,
+               COALESCE((SELECT t.title FROM urls t
+                         WHERE t.canonical_url = u.canonical_url AND t.title IS NOT NULL
+                         ORDER BY t.last_visit_time DESC LIMIT 1), ''),
+               COALESCE((SELECT c.content FROM content c JOIN urls cu ON cu.id = c.url_id
+                         WHERE cu.canonical_url = u.canonical_url
+                         ORDER BY c.updated_at DESC LIMIT 1), ''),
+               COALESCE((SELECT group_concat(DISTINCT 'd' || replace(v.visit_date, '-', '')
+                                 || ' m' || substr(replace(v.visit_date, '-', ''), 1, 6)
+                                 || ' y' || substr(v.visit_date, 1, 4))
+                         FROM urls vu JOIN visits v ON v.url_id = vu.id
+                         WHERE vu.canonical_url = u.canonical_url), '')
+        FROM urls u {where} GROUP BY u.canonical_url"""
+
+    def _index_pages(self, canonical_urls):
+        """(Re)build the full-text rows of pages; call with the write lock held"""
+        canonical_urls = list(canonical_urls)
+        if not canonical_urls:
+            return
+        # One JSON parameter however many pages, so a whole history stays under SQLite's variable limit
+        canonical_urls = json.dumps(canonical_urls)
+        self._conn.execute(
+            """DELETE FROM page_search WHERE rowid IN (
+                   SELECT MIN(id) FROM urls WHERE canonical_url IN (SELECT value FROM json_each(?))
+                   GROUP BY canonical_url)""",
+            (canonical_urls,)
+        )
+        self._conn.execute(
+            "INSERT INTO page_search (rowid, url, title, content, visited) "
+            + self.PAGE_SEARCH_ROWS.format(where="WHERE u.canonical_url IN (SELECT value FROM json_each(?))"),
+            (canonical_urls,)
+        )
+
+    def _update_analytics(self, visits, known_pages: set):
+        """Add (url, canonical_url, domain, category, visit_time, visit_count) rows
+        to the running totals; ``known_pages`` are canonical URLs already counted"""
+        domains, categories = {}, {}
+        for url, canonical, domain, category, time, count in visits:
+            stats = domains.setdefault(domain, [categorize_domain(domain), 0, 0, time, time])
+            stats[1] += count
+            if canonical not in known_pages:
+                known_pages.add(canonical)
+                stats[2] += 1
+            stats[3], stats[4] = min(stats[3], time), max(stats[4], time)
+            categories[category] = categories.get(category, 0) + count
+        self._conn.executemany(
+            """INSERT INTO domain_stats (domain, category, visits, unique_pages, first_visit, last_visit)
+               VALUES (?, ?, ?, ?, ?, ?)
+               ON CONFLICT(domain) DO UPDATE SET
+                   visits = visits + excluded.visits,
+                   unique_pages = unique_pages + excluded.unique_pages,
+                   first_visit = MIN(first_visit, excluded.first_visit),
+                   last_visit = MAX(last_visit, excluded.last_visit)""",
+            [(domain, *stats) for domain, stats in domains.items()]
+        )
+        self._conn.executemany(
+            """INSERT INTO category_stats (category, visits) VALUES (?, ?)
+               ON CONFLICT(category) DO UPDATE SET visits = visits + excluded.visits""",
+            categories.items()
+        )
+
+    def _update_rollups(self, visits):
+        """Add (domain, category, visit_time, visit_count) rows to the hour, day and week rollups"""
+        rollups = {}
+        for domain, category, time, count in visits:
+            for granularity in ROLLUP_GRANULARITIES:
+                key = (granularity, bucket_start(granularity, time), domain, category)
+                rollups[key] = rollups.get(key, 0) + count
+        self._conn.executemany(
+            """INSERT INTO rollups (granularity, bucket, domain, category, visits) VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT(granularity, bucket, domain, category) DO UPDATE SET visits = visits + excluded.visits""",
+            [(*key, visits) for key, visits in rollups.items()]
+        )
+
+    def merge(self, entries, on_changed=None, batch_size: int = 500) -> dict:
+        """Upsert extension history entries, returning counts of what changed
+
+        ``entries`` may be any iterable (e.g. a streamed request body); it is
+        consumed in batches, so memory does not grow with its length.
+        ``on_changed(url, last_visit_time)`` is called for each new or newly
+        visited URL. Entries without an http(s) URL or lastVisitTime count as invalid.
+        """
+        summary = {'received': 0, 'new': 0, 'updated': 0, 'unchanged': 0, 'invalid': 0}
+        batch = []
+        try:
+            for entry in entries:
+                summary['received'] += 1
+                if (not isinstance(entry, dict) or not isinstance(entry.get('url'), str)
+                        or not is_valid_url(entry['url'])
+                        or not isinstance(entry.get('lastVisitTime'), (int, float))):
+                    summary['invalid'] += 1
+                    continue
+                # Only the fields stored are kept; visit lists can be large
+                batch.append((entry['url'], int(entry['lastVisitTime']), entry.get('title'),
+                              int(entry.get('visitCount') or 0)))
+                if len(batch) >= batch_size:
+                    pending, batch = batch, []
+                    self._merge_batch(pending, summary, on_changed)
+        finally:
+            # Keep what was read even if the rest of ``entries`` fails to parse
+            if batch:
+                self._merge_batch(batch, summary, on_changed)
+        return summary
+
+    def _merge_batch(self, batch, summary, on_changed):
+        # Later duplicates of a URL within the batch win only if more recent
+        latest = {}
+        for entry in batch:
+            if entry[0] not in latest or entry[1] > latest[entry[0]][1]:
+                latest[entry[0]] = entry
+        summary['unchanged'] += len(batch) - len(latest)
+
+        with self._lock, self._conn:
+            placeholders = ', '.join('?' * len(latest))
+            stored = {url: (last_visit_time, visit_count) for url, last_visit_time, visit_count in self._conn.execute(
+                f"SELECT url, last_visit_time, visit_count FROM urls WHERE url IN ({placeholders})", list(latest)
+            )}
+            changed = []
+            for url, last_visit_time, title, visit_count in latest.values():
+                if url not in stored:
+                    summary['new'] += 1
+                    new_visits = max(visit_count, 1)
+                elif last_visit_time > stored[url][0]:
+                    summary['updated'] += 1
+                    new_visits = max(visit_count - stored[url][1], 1)
+                else:
+                    summary['unchanged'] += 1
+                    continue
+                changed.append((url, last_visit_time, title, new_visits))
+            self._index_pages(self._record_visits(changed))
+        if on_changed:
+            for url, last_visit_time, _, _ in changed:
+                on_changed(url, last_visit_time)
+
+    def import_contents(self, entries, batch_size: int = 500) -> int:
+        """Import processed history records (url, ISO timestamp, no_of_visits,
+        content), as in the contents.json export, returning how many were stored"""
+        imported, batch, contents = 0, [], []
+
+        def flush():
+            with self._lock, self._conn:
+                pages = self._record_visits(batch)
+                ids = self._url_ids({url for url, _ in contents})
+                # The first content seen for a URL is kept, as when the export was read
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO content (url_id, content, updated_at) VALUES (?, ?, ?)",
+                    [(ids[url], content, now_ms()) for url, content in contents]
+                )
+                self._index_pages(pages | {canonicalize_url(url) for url, _ in contents})
+            batch.clear()
+            contents.clear()
+
+        for entry in entries:
+            try:
+                visit_time = int(datetime.fromisoformat(entry['timestamp']).timestamp() * 1000)
+            except (KeyError, TypeError, ValueError):
+                continue
+            batch.append((entry['url'], visit_time, None, entry.get('no_of_visits') or 1))
+            if entry.get('content'):
+                contents.append((entry['url'], entry['content']))
+            imported += 1
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+        return imported
+
+    def set_contents(self, contents):
+        """Store the extracted text of pages from (url, content) pairs, under
+        every visited variant of each page"""
+        contents = [(content, now_ms(), canonicalize_url(url)) for url, content in contents]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                """INSERT INTO content (url_id, content, updated_at)
+                   SELECT id, ?, ? FROM urls WHERE canonical_url = ?
+                   ON CONFLICT(url_id) DO UPDATE SET content = excluded.content, updated_at = excluded.updated_at""",
+                contents
+            )
+            self._index_pages({canonical for _, _, canonical in contents})
+
+    VISIT_COLUMNS = """u.url, u.canonical_url, u.domain, u.category, u.title,
+                       v.visit_time, v.visit_date, v.visit_count, s.term AS search_term"""
+    VISIT_JOINS = """FROM visits v
+                     JOIN urls u ON u.id = v.url_id
+                     LEFT JOIN search_terms s ON s.url_id = u.id"""
+
+    def visits_between(self, start_date: str, end_date: str):
+        """Visits from ``start_date`` to ``end_date`` (YYYY-MM-DD, UTC, inclusive)
+        in the order they were recorded, with their URL's details and any search term"""
+        return [dict(row) for row in self._reader().execute(
+            f"""SELECT {self.VISIT_COLUMNS} {self.VISIT_JOINS}
+                WHERE v.visit_date BETWEEN ? AND ?
+                ORDER BY v.id""",
+            (start_date, end_date)
+        )]
+
+    def visits_since(self, revision: int):
+        """Visits added or changed after ``revision`` (each with its ``visit_id``),
+        oldest change first, and the store's current revision
+
+        Served from the revision index, so the cost follows the number of changes.
+        """
+        conn = self._reader()
+        # One read transaction, so the rows and the revision agree
+        with conn:
+            conn.execute("BEGIN")
+            current = conn.execute("SELECT value FROM store_meta WHERE key = 'revision'").fetchone()[0]
+            rows = conn.execute(
+                f"""SELECT v.id AS visit_id, {self.VISIT_COLUMNS} {self.VISIT_JOINS}
+                    WHERE v.revision > ?
+                    ORDER BY v.revision, v.id""",
+                (revision,)
+            ).fetchall()
+        return [dict(row) for row in rows], current
+
+    def visit_records(self, revision: int = -1):
+        """(visit_id, url_id, visit_time, visit_count) for visits added or changed
+        after ``revision``, oldest change first, and the store's current revision;
+        a lighter visits_since for bulk loading"""
+        conn = self._reader()
+        with conn:
+            conn.execute("BEGIN")
+            current = conn.execute("SELECT value FROM store_meta WHERE key = 'revision'").fetchone()[0]
+            rows = conn.execute(
+                """SELECT id, url_id, visit_time, visit_count FROM visits
+                   WHERE revision > ? ORDER BY revision, id""",
+                (revision,)
+            ).fetchall()
+        return rows, current
+
+    def url_records(self, after_id: int = 0):
+        """(id, canonical_url, domain, category) for URLs stored after ``after_id``, in id order"""
+        return self._reader().execute(
+            "SELECT id, canonical_url, domain, category FROM urls WHERE id > ? ORDER BY id", (after_id,)
+        ).fetchall()
+
+    def search(self, query: str, domain: str = None, start: int = None, end: int = None,
+               limit: int = 20, marks=('**', '**')):
+        """Pages matching ``query`` (see fts_query) in their URL, title or
+        content, best match first
+
+        ``domain`` also matches its subdomains; ``start``/``end`` (ms) keep
+        pages visited in [start, end). Each result has the page's url, domain,
+        category, title and a content snippet with the matched terms wrapped
+        in ``marks``, its visits, last visit time and BM25 score (lower is
+        better; title matches weigh most, then the URL).
+
+        The SEARCH_CANDIDATES most recently first seen pages that match and
+        pass the filters are found from the index alone (filters are matched
+        as ``url`` and ``visited`` terms, then checked exactly), and only
+        those are ranked, which bounds the cost of common words.
+        """
+        conn = self._reader()
+        match = fts_query(query)
+        candidate_match, conditions, params = match, [], []
+        if domain:
+            domain = canonical_host(domain)
+            # The top-level domain is in nearly every URL, so leave it to the exact check
+            labels = re.findall(r'\w+', domain)[:-1] or re.findall(r'\w+', domain)
+            if labels:
+                candidate_match += f" AND url : ({' AND '.join(labels)})"
+            conditions.append("(u.domain = ? OR u.domain LIKE ?)")
+            params += [domain, f"%.{domain}"]
+        if start is not None or end is not None:
+            # Tokens only for dates with visits, so open-ended windows stay short
+            first, last = conn.execute(
+                "SELECT (SELECT MIN(visit_date) FROM visits), (SELECT MAX(visit_date) FROM visits)").fetchone()
+            if first is None:
+                return []
+            first = max(first, visit_date(start or 0))
+            if end is not None:
+                last = min(last, visit_date(end - 1))
+            tokens = visited_tokens(date.fromisoformat(first), date.fromisoformat(last))
+            if not tokens:
+                return []
+            candidate_match += f" AND visited : ({' OR '.join(tokens)})"
+            if (start or 0) % DAY_MS or (end or 0) % DAY_MS:
+                # Bounds inside a day: the tokens select whole days, so check the visit times too
+                conditions.append(
+                    """EXISTS (SELECT 1 FROM urls pu JOIN visits v ON v.url_id = pu.id
+                               WHERE pu.canonical_url = u.canonical_url
+                               AND v.visit_time >= ? AND v.visit_time < ?)""")
+                params += [start or 0, END_OF_TIME if end is None else end]
+        candidates = [row[0] for row in conn.execute(
+            f"""SELECT page_search.rowid FROM page_search CROSS JOIN urls u ON u.id = page_search.rowid
+                WHERE {' AND '.join(['page_search MATCH ?', *conditions])}
+                ORDER BY page_search.rowid DESC LIMIT ?""",
+            [candidate_match, *params, SEARCH_CANDIDATES]
+        )]
+        if not candidates:
+            return []
+        # Ranked without the filter terms, whose document counts BM25 would otherwise read in full
+        results = [dict(row) for row in conn.execute(
+            """SELECT u.canonical_url AS url, u.domain, u.category,
+                      highlight(page_search, 1, ?, ?) AS title,
+                      snippet(page_search, 2, ?, ?, '…', 24) AS snippet,
+                      bm25(page_search, 2.0, 5.0, 1.0, 0.0) AS score
+               FROM page_search CROSS JOIN urls u ON u.id = page_search.rowid
+               WHERE page_search MATCH ? AND page_search.rowid BETWEEN ? AND ?
+                     AND +u.id IN (SELECT value FROM json_each(?))
+               ORDER BY score LIMIT ?""",
+            [*marks, *marks, match, candidates[-1], candidates[0], json.dumps(candidates), limit]
+        )]
+        if results:
+            placeholders = ', '.join('?' * len(results))
+            visits = {row[0]: row[1:] for row in conn.execute(
+                f"""SELECT canonical_url, SUM(visit_count), MAX(last_visit_time) FROM urls
+                    WHERE canonical_url IN ({placeholders}) GROUP BY canonical_url""",
+                [result['url'] for result in results]
+            )}
+            for result in results:
+                result['visit_count'], result['last_visit_time'] = visits[result['url']]
+                result['snippet'] = ' '.join(result['snippet'].split())
+        return results
+
+    def top_domains(self, limit: int):
+        """The ``limit`` most visited domains with their running totals, most visited first"""
+        return [dict(row) for row in self._reader().execute(
+            """SELECT domain, category, visits, unique_pages, first_visit, last_visit
+               FROM domain_stats ORDER BY visits DESC, id LIMIT ?""",
+            (limit,)
+        )]
+
+    def category_totals(self):
+        """(category, visits) pairs, most visited first"""
+        return [tuple(row) for row in self._reader().execute(
+            "SELECT category, visits FROM category_stats ORDER BY visits DESC, id")]
+
+    def rollup_totals(self, start: int = None, end: int = None, by: str = 'category'):
+        """(domain or category, visits) pairs for visits in [start, end) (ms,
+        widened to whole hours; None leaves that end open), most visited first
+
+        Merged from the rollups' coarsest buckets that fit the range (see
+        rollup_spans), so years of history cost a few hundred rows.
+        """
+        if by not in ('domain', 'category'):
+            raise ValueError(f"Cannot total visits by {by!r}")
+        start, end = start or 0, END_OF_TIME if end is None else end
+        spans = rollup_spans(bucket_start('hour', start), -(-end // HOUR_MS) * HOUR_MS)
+        if not spans:
+            return []
+        conditions = ' OR '.join(['(granularity = ? AND bucket >= ? AND bucket < ?)'] * len(spans))
+        return [tuple(row) for row in self._reader().execute(
+            f"""SELECT {by}, SUM(visits) AS total FROM rollups WHERE {conditions}
+                GROUP BY {by} ORDER BY total DESC, {by}""",
+            [value for span in spans for value in span]
+        )]
+
+    def rollup_series(self, granularity: str, start: int = None, end: int = None, by: str = None):
+        """(bucket start, visits) rows, or (bucket start, domain or category,
+        visits) rows with ``by``, for the ``granularity`` buckets overlapping
+        [start, end) (ms; None leaves that end open), oldest first"""
+        if granularity not in ROLLUP_GRANULARITIES:
+            raise ValueError(f"Unknown granularity {granularity!r}")
+        if by not in (None, 'domain', 'category'):
+            raise ValueError(f"Cannot total visits by {by!r}")
+        columns = f"bucket, {by}" if by else "bucket"
+        return [tuple(row) for row in self._reader().execute(
+            f"""SELECT {columns}, SUM(visits) FROM rollups
+                WHERE granularity = ? AND bucket >= ? AND bucket < ?
+                GROUP BY {columns} ORDER BY {columns}""",
+            (granularity, bucket_start(granularity, start or 0), END_OF_TIME if end is None else end)
+        )]
+
+    def pages(self):
+        """Yield (canonical_url, last_visit_time, no_of_visits) per page, most recent first
+
+        ``no_of_visits`` counts the history entries grouped under the page.
+        """
+        yield from self._reader().execute(
+            """SELECT canonical_url, MAX(last_visit_time), COUNT(*) FROM urls
+               GROUP BY canonical_url ORDER BY MAX(last_visit_time) DESC"""
+        ).fetchall()
+
+    def __len__(self) -> int:
+        return self._reader().execute("SELECT COUNT(DISTINCT canonical_url) FROM urls").fetchone()[0]
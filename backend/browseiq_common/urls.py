@@ -0,0 +1,71 @@
+"""URL canonicalization, so every place that keys data by URL agrees on one form."""
+
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that only track how a page was reached
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'yclid', 'igshid', 'mc_cid', 'mc_eid',
+    '_ga', '_gl', 'ref_src', 'spm'
+}
+TRACKING_PREFIXES = ('utm_',)
+
+# Google search/session parameters that do not change the results shown
+GOOGLE_TRACKING_PARAMS = {
+    'rlz', 'oq', 'gs_lcrp', 'gs_lp', 'sei', 'sourceid', 'ie', 'oe', 'ved', 'ei', 'aqs',
+    'uact', 'sclient', 'sca_esv', 'sca_upv', 'sxsrf', 'iflsig', 'bih', 'biw', 'dpr',
+    'client', 'source', 'sa', 'usg', 'gs_ssp', 'gs_l', 'pq', 'cshid', 'fir', 'vet'
+}
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def is_valid_url(url: str) -> bool:
+    """Whether a URL is an absolute http(s) URL with a host"""
+    try:
+        result = urlsplit(url)
+        return result.scheme in DEFAULT_PORTS and bool(result.netloc)
+    except (TypeError, ValueError):
+        return False
+
+
+def canonical_host(host: str) -> str:
+    """Lower-case a host name and drop a leading "www." """
+    host = host.lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+def canonicalize_url(url: str) -> str:
+    """Return the canonical form of a URL.
+
+    Strips known tracking parameters, sorts the query string, lower-cases the
+    scheme and host, drops "www.", credentials, default ports and the
+    fragment. Anything other than an absolute http(s) URL is returned unchanged.
+    """
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return url
+
+    host = canonical_host(parts.hostname)
+    netloc = f"{host}:{port}" if port and port != DEFAULT_PORTS[scheme] else host
+
+    is_google = host == 'google.com' or host.startswith('google.') or '.google.' in host
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS
+        and not key.lower().startswith(TRACKING_PREFIXES)
+        and not (is_google and key.lower() in GOOGLE_TRACKING_PARAMS)
+    )
+    return urlunsplit((scheme, netloc, parts.path or '/', urlencode(query), ''))
+
+
+def canonical_domain(url: str) -> str:
+    """Domain a URL is grouped under in analytics (lower-case, no "www.")"""
+    try:
+        return canonical_host(urlsplit(url).hostname or '')
+    except ValueError:
+        return ''
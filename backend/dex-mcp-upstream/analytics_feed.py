@@ -0,0 +1,143 @@
+"""Browsing analytics snapshot for the REST app, regenerated when the history changes."""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+
+# Brotli is optional; without it responses are gzip-compressed
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Bodies smaller than this are sent uncompressed
+MIN_COMPRESS_SIZE = 512
+
+
+def accepted_encodings(accept_encoding: str) -> set:
+    """Content codings named in an Accept-Encoding header, minus any refused with q=0"""
+    accepted = set()
+    for part in accept_encoding.lower().split(','):
+        coding, _, params = part.partition(';')
+        if params.replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        if coding.strip():
+            accepted.add(coding.strip())
+    return accepted
+
+
+class AnalyticsSnapshot:
+    """Analytics JSON encoded once for HTTP: the body, its ETag and compressed forms"""
+
+    def __init__(self, analytics):
+        self.analytics = analytics
+        self.body = json.dumps(analytics, separators=(',', ':')).encode('utf-8')
+        self.etag = f'"{hashlib.sha1(self.body).hexdigest()}"'
+        self._compressed = {}
+
+    def matches(self, if_none_match: str) -> bool:
+        """Whether an If-None-Match header names this snapshot"""
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        return '*' in tags or any(tag.removeprefix('W/') == self.etag for tag in tags)
+
+    def encoded(self, accept_encoding: str):
+        """(body, content coding or None) for a request's Accept-Encoding"""
+        if len(self.body) < MIN_COMPRESS_SIZE:
+            return self.body, None
+        accepted = accepted_encodings(accept_encoding)
+        if brotli is not None and 'br' in accepted:
+            coding = 'br'
+        elif 'gzip' in accepted:
+            coding = 'gzip'
+        else:
+            return self.body, None
+        if coding not in self._compressed:
+            self._compressed[coding] = (brotli.compress(self.body) if coding == 'br'
+                                        else gzip.compress(self.body, mtime=0))
+        return self._compressed[coding], coding
+
+    def event(self) -> str:
+        """The snapshot as a server-sent event"""
+        return f"event: analytics\nid: {self.etag[1:-1]}\ndata: {self.body.decode('utf-8')}\n\n"
+
+
+class AnalyticsFeed:
+    """Keeps the current analytics snapshot and pushes each change to subscribers.
+
+    ``build()`` returns the analytics dict (or None without history) and
+    ``get_store()`` the history store it reads. A snapshot is rebuilt only
+    when SQLite's data_version shows another connection (any process
+    ingesting history) has committed; ``watch()`` checks that every
+    ``poll_interval`` seconds so subscribers hear of changes without polling.
+    Use it from one event loop.
+    """
+
+    def __init__(self, build, get_store, poll_interval: float = 1.0):
+        self._build = build
+        self._get_store = get_store
+        self.poll_interval = poll_interval
+        self.snapshot = None
+        self._lock = threading.Lock()
+        self._version_conn = None
+        self._data_version = None
+        self._changed = asyncio.Event()
+
+    def refresh(self) -> bool:
+        """Rebuild the snapshot if the history has changed, returning whether its content did"""
+        with self._lock:
+            if self._version_conn is None:
+                self._version_conn = sqlite3.connect(self._get_store().path, check_same_thread=False)
+            data_version = self._version_conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version == self._data_version:
+                return False
+            snapshot = AnalyticsSnapshot(self._build())
+            self._data_version = data_version
+            if self.snapshot is not None and snapshot.etag == self.snapshot.etag:
+                return False
+            self.snapshot = snapshot
+            return True
+
+    async def current(self) -> AnalyticsSnapshot:
+        """The up-to-date snapshot"""
+        if await asyncio.to_thread(self.refresh):
+            self._publish()
+        return self.snapshot
+
+    def _publish(self):
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def watch(self):
+        """Check for history changes until cancelled, publishing new snapshots"""
+        while True:
+            try:
+                await self.current()
+            except Exception as e:
+                logger.error(f"Error refreshing browsing analytics: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def updates(self, keepalive: float = 15.0):
+        """Server-sent events: the current snapshot, then one per change
+
+        Yields an SSE comment every ``keepalive`` seconds without changes,
+        so proxies keep the connection open.
+        """
+        snapshot = await self.current()
+        changed = self._changed
+        if snapshot.analytics is not None:
+            yield snapshot.event()
+        while True:
+            try:
+                await asyncio.wait_for(changed.wait(), keepalive)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            changed = self._changed
+            if self.snapshot.analytics is not None:
+                yield self.snapshot.event()
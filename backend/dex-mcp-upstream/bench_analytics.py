@@ -0,0 +1,111 @@
+"""Benchmark: generate_browsing_analytics_tool before and after the history store.
+
+Usage: python bench_analytics.py [entries] [unique_urls]
+
+Builds a synthetic history in a temporary store and contents.json, then
+times the tool as shipped before the history store (bench_analytics_legacy,
+which json.loads contents.json and loops over every entry on each call)
+against the current tool and browsing_analytics over the same visits.
+Their outputs differ by design (pages are grouped by canonical URL and the
+category rules changed), so only the current running-total and columnar
+window paths are checked against each other.
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+# backend/ holds the browseiq_common package shared with url_scraping
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.append(BACKEND_DIR)
+
+from browseiq_common.history_store import HistoryStore
+
+import bench_analytics_legacy
+from tools import browser
+
+SITES = ['github.com', 'stackoverflow.com', 'www.reddit.com', 'news.ycombinator.com', 'www.amazon.com',
+         'www.netflix.com', 'docs.python.org', 'mail.google.com', 'www.youtube.com', 'en.wikipedia.org',
+         'calendar.google.com', 'www.coursera.org', 'open.spotify.com', 'www.bbc.com', 'example.org']
+WORDS = ['python', 'async', 'index', 'query', 'render', 'cookie', 'layout', 'stream', 'parser', 'vector']
+
+
+def make_entries(rng: random.Random, count: int, unique_urls: int):
+    """contents.json-style entries: ``count`` visits spread over ``unique_urls`` pages and two years"""
+    urls = []
+    for i in range(unique_urls):
+        site = rng.choice(SITES)
+        if site == 'example.org' or rng.random() < 0.05:
+            urls.append(f"https://www.google.com/search?q={rng.choice(WORDS)}+{rng.choice(WORDS)}&oq=x{i}")
+        else:
+            urls.append(f"https://{site}/{rng.choice(WORDS)}/{i}?utm_source=feed" if i % 7 == 0
+                        else f"https://{site}/{rng.choice(WORDS)}/{i}")
+    start = datetime(2023, 6, 1, tzinfo=timezone.utc)
+    entries = []
+    for i in range(count):
+        url = urls[int(rng.paretovariate(1.2)) % unique_urls]
+        timestamp = start + timedelta(seconds=i * 2 * 365 * 86400 // count)
+        entries.append({'url': url, 'timestamp': timestamp.isoformat().replace('+00:00', 'Z'),
+                        'no_of_visits': 1, 'content': f"{url.split('/')[-1]} - Page title\nBody text"})
+    return entries
+
+
+def timed(name, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<34} {elapsed:8.3f} s")
+    return result, elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    unique_urls = int(sys.argv[2]) if len(sys.argv) > 2 else 50_000
+    rng = random.Random(42)
+    entries = make_entries(rng, count, unique_urls)
+    print(f"{count} entries over {unique_urls} URLs")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.makedirs(os.path.join(tmp, 'data'))
+        with open(os.path.join(tmp, 'data', 'contents.json'), 'w', encoding='utf-8') as f:
+            json.dump(entries, f)
+        store = HistoryStore(os.path.join(tmp, 'history.db'))
+        timed("import into store (one-off)", lambda: store.import_contents(entries, batch_size=10_000))
+        browser._history_store = store
+        output_file = os.path.join(tmp, 'browsing_analytics.json')
+
+        # The legacy tool reads data/contents.json from the working directory
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            legacy, legacy_time = timed("legacy tool",
+                                        lambda: bench_analytics_legacy.generate_browsing_analytics_tool(output_file))
+        finally:
+            os.chdir(cwd)
+        assert 'error' not in json.loads(legacy), legacy
+        _, tool_time = timed("tool: running totals",
+                             lambda: browser.generate_browsing_analytics_tool(output_file))
+        totals, totals_time = timed("browsing_analytics: running totals", browser.browsing_analytics)
+        timed("frame: first load (one-off)", browser.get_history_frame().refresh)
+        first_day, last_day = entries[0]['timestamp'][:10], entries[-1]['timestamp'][:10]
+        window, window_time = timed("browsing_analytics: all history",
+                                    lambda: browser.browsing_analytics(start_date=first_day, end_date=last_day))
+        print(f"running totals match window: {totals == window}")
+        print(f"speedup: {legacy_time / tool_time:.0f}x per tool call "
+              f"({legacy_time / totals_time:.0f}x running totals, {legacy_time / window_time:.0f}x window)")
+
+        for days in (1, 7, 30, 365):
+            first_day = (datetime.fromisoformat(last_day) - timedelta(days=days - 1)).date().isoformat()
+            timed(f"browsing_analytics: last {days} days",
+                  lambda: browser.browsing_analytics(start_date=first_day, end_date=last_day))
+
+        store.merge([{'url': 'https://github.com/new/page', 'lastVisitTime': int(time.time() * 1000), 'visitCount': 3}])
+        timed("frame: pick up a new visit", browser.get_history_frame().refresh)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,280 @@
+"""generate_browsing_analytics_tool and its helpers as shipped before the
+history store, copied verbatim from tools/browser.py for bench_analytics.
+
+The tool reads ``data/contents.json`` relative to the working directory.
+"""
+
+import json
+import os
+from urllib.parse import urlparse
+from collections import defaultdict, Counter
+import re
+
+
+def generate_browsing_analytics_tool(output_file: str = "data/browsing_analytics.json") -> str:
+    """
+    Analyze browsing patterns to show what you search for most and website visit frequencies.
+    
+    Focuses on:
+    - URL frequency analysis with visit counts
+    - Website categorization for better organization
+    - Search pattern identification
+    - Data suitable for pie chart visualization
+    
+    Args:
+        output_file: Path to save the analytics JSON file
+        
+    Returns:
+        Summary of most visited sites, search patterns, and category breakdown
+    """
+    try:
+        # Load browsing history data
+        data_file = "data/contents.json"
+        if not os.path.exists(data_file):
+            return json.dumps({"error": f"Browsing history data file not found at {data_file}"}, indent=2)
+        
+        with open(data_file, 'r', encoding='utf-8') as f:
+            browsing_data = json.load(f)
+        
+        # Initialize analytics structures
+        domain_stats = defaultdict(lambda: {
+            'total_visits': 0,
+            'unique_pages': 0,
+            'urls': [],
+            'titles': [],
+            'first_visit': None,
+            'last_visit': None
+        })
+        
+        url_frequency = Counter()
+        search_queries = Counter()
+        category_stats = defaultdict(int)
+        
+        # Process each browsing entry
+        for entry in browsing_data:
+            url = entry.get('url', '')
+            visits = entry.get('no_of_visits', 1)
+            timestamp = entry.get('timestamp', '')
+            content = entry.get('content', '')
+            
+            # Count URL frequency
+            url_frequency[url] += visits
+            
+            # Extract domain
+            try:
+                parsed_url = urlparse(url)
+                domain = parsed_url.netloc.lower()
+                if domain.startswith('www.'):
+                    domain = domain[4:]
+            except:
+                domain = 'unknown'
+            
+            # Extract page title from content or URL
+            title = extract_title_from_content(content, url)
+            
+            # Extract search queries from Google searches
+            if 'google.com/search' in url and 'q=' in url:
+                try:
+                    from urllib.parse import parse_qs, urlparse
+                    parsed = urlparse(url)
+                    params = parse_qs(parsed.query)
+                    if 'q' in params:
+                        query = params['q'][0]
+                        search_queries[query] += visits
+                except:
+                    pass
+            
+            # Update domain statistics
+            domain_stats[domain]['total_visits'] += visits
+            domain_stats[domain]['unique_pages'] += 1
+            domain_stats[domain]['urls'].append({'url': url, 'visits': visits, 'title': title})
+            if title:
+                domain_stats[domain]['titles'].append(title)
+            
+            # Update visit timestamps
+            if timestamp:
+                if not domain_stats[domain]['first_visit'] or timestamp < domain_stats[domain]['first_visit']:
+                    domain_stats[domain]['first_visit'] = timestamp
+                if not domain_stats[domain]['last_visit'] or timestamp > domain_stats[domain]['last_visit']:
+                    domain_stats[domain]['last_visit'] = timestamp
+            
+            # Categorize and count
+            domain_category = categorize_domain(domain, url, content)
+            category_stats[domain_category] += visits
+        
+        # Convert domain stats to list format
+        domain_list = []
+        for domain, stats in domain_stats.items():
+            # Get top URLs for this domain
+            top_urls = sorted(stats['urls'], key=lambda x: x['visits'], reverse=True)[:10]
+            
+            domain_list.append({
+                'domain': domain,
+                'total_visits': stats['total_visits'],
+                'unique_pages': stats['unique_pages'],
+                'category': categorize_domain(domain, '', ''),
+                'top_urls': top_urls
+            })
+        
+        # Sort domains by total visits
+        domain_list.sort(key=lambda x: x['total_visits'], reverse=True)
+        
+        # Get top URLs overall
+        top_urls_overall = [
+            {'url': url, 'visits': count} 
+            for url, count in url_frequency.most_common(20)
+        ]
+        
+        # Get top search queries
+        top_searches = [
+            {'query': query, 'searches': count} 
+            for query, count in search_queries.most_common(10)
+        ]
+        
+        # Create analytics output optimized for pie charts and frequency analysis
+        analytics = {
+            'domain_frequency': [
+                {
+                    'domain': domain['domain'],
+                    'visits': domain['total_visits'],
+                    'category': domain['category'],
+                    'percentage': round((domain['total_visits'] / sum(d['total_visits'] for d in domain_list)) * 100, 1)
+                }
+                for domain in domain_list[:15]  # Top 15 for pie chart
+            ],
+            'category_breakdown': [
+                {
+                    'category': category,
+                    'visits': visits,
+                    'percentage': round((visits / sum(category_stats.values())) * 100, 1)
+                }
+                for category, visits in sorted(category_stats.items(), key=lambda x: x[1], reverse=True)
+            ]
+        }
+        
+        # Save analytics to file
+        if output_file and os.path.dirname(output_file):
+            os.makedirs(os.path.dirname(output_file), exist_ok=True)
+        
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(analytics, f, indent=2, ensure_ascii=False)
+        
+        # Return JSON format only
+        return json.dumps(analytics, indent=2, ensure_ascii=False)
+        
+    except Exception as e:
+        return json.dumps({"error": f"Error generating browsing analytics: {str(e)}"}, indent=2)
+
+def extract_title_from_content(content: str, url: str) -> str:
+    """Extract meaningful title from page content or URL."""
+    if not content:
+        return extract_title_from_url(url)
+    
+    # Try to extract title from common patterns in content
+    content_lower = content.lower()
+    
+    # Look for common title patterns
+    title_patterns = [
+        r'(.*?)\s*[-|–]\s*.*',  # Title - Site pattern
+        r'(.*?)\s*\|\s*.*',     # Title | Site pattern
+        r'^([^•\n]{10,100})',   # First substantial line
+    ]
+    
+    lines = [line.strip() for line in content.split('\n') if line.strip()]
+    if lines:
+        first_line = lines[0]
+        
+        # Try patterns
+        for pattern in title_patterns:
+            match = re.match(pattern, first_line)
+            if match:
+                title = match.group(1).strip()
+                if len(title) > 5 and not title.lower().startswith(('skip', 'navigation', 'menu')):
+                    return title
+        
+        # If no pattern matches, use first line if it's reasonable
+        if 5 <= len(first_line) <= 100 and not first_line.lower().startswith(('skip', 'navigation', 'menu')):
+            return first_line
+    
+    # Fallback to URL-based title
+    return extract_title_from_url(url)
+
+def extract_title_from_url(url: str) -> str:
+    """Extract a title from URL structure."""
+    try:
+        parsed = urlparse(url)
+        
+        # Handle search queries
+        if 'search' in parsed.path or 'q=' in parsed.query:
+            if 'q=' in parsed.query:
+                from urllib.parse import parse_qs
+                params = parse_qs(parsed.query)
+                if 'q' in params:
+                    return f"Search: {params['q'][0]}"
+        
+        # Use path segments
+        path_parts = [part for part in parsed.path.split('/') if part and part != 'index.html']
+        if path_parts:
+            # Clean up the last path segment
+            title = path_parts[-1].replace('-', ' ').replace('_', ' ')
+            # Capitalize words
+            title = ' '.join(word.capitalize() for word in title.split())
+            return title
+        
+        # Use domain as fallback
+        domain = parsed.netloc
+        if domain.startswith('www.'):
+            domain = domain[4:]
+        return domain.split('.')[0].capitalize()
+    
+    except:
+        return 'Unknown Page'
+
+def categorize_domain(domain: str, url: str, content: str) -> str:
+    """Categorize a domain based on its name, URL patterns, and content."""
+    domain_lower = domain.lower()
+    url_lower = url.lower()
+    content_lower = content.lower()
+    
+    # Social Media
+    social_domains = ['facebook', 'twitter', 'instagram', 'linkedin', 'youtube', 'tiktok', 'reddit', 'discord']
+    if any(social in domain_lower for social in social_domains):
+        return 'Social Media'
+    
+    # Search Engines
+    search_domains = ['google', 'bing', 'yahoo', 'duckduckgo']
+    if any(search in domain_lower for search in search_domains) and ('search' in url_lower or 'q=' in url_lower):
+        return 'Search'
+    
+    # News & Media
+    news_domains = ['news', 'cnn', 'bbc', 'reuters', 'ap', 'nbc', 'abc', 'cbs', 'fox', 'npr', 'bloomberg', 'techcrunch', 'wired']
+    if any(news in domain_lower for news in news_domains):
+        return 'News & Media'
+    
+    # Tech & Development
+    tech_domains = ['github', 'stackoverflow', 'developer', 'docs', 'api', 'chrome', 'microsoft', 'apple']
+    if any(tech in domain_lower for tech in tech_domains):
+        return 'Technology'
+    
+    # E-commerce
+    commerce_domains = ['amazon', 'ebay', 'shop', 'store', 'buy', 'cart']
+    if any(commerce in domain_lower for commerce in commerce_domains):
+        return 'E-commerce'
+    
+    # Education
+    edu_domains = ['edu', 'university', 'college', 'learn', 'course', 'tutorial']
+    if any(edu in domain_lower for edu in edu_domains):
+        return 'Education'
+    
+    # Entertainment
+    entertainment_domains = ['netflix', 'hulu', 'disney', 'spotify', 'music', 'game', 'entertainment']
+    if any(ent in domain_lower for ent in entertainment_domains):
+        return 'Entertainment'
+    
+    # Business Tools
+    business_domains = ['calendar', 'email', 'office', 'workspace', 'drive', 'cloud', 'teams']
+    if any(biz in domain_lower for biz in business_domains):
+        return 'Business Tools'
+    
+    # Default category
+    return 'Other' 
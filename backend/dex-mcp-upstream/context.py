@@ -1,78 +1,239 @@
 import asyncio
+import itertools
 import json
-import uuid
 from typing import Any, Optional
 import websockets
 from websockets.server import WebSocketServerProtocol
 
+# Requests a single browser works on at once; more wait for a free slot
+MAX_IN_FLIGHT = 8
+
+NO_CONNECTION = "No connection to browser extension. Please connect your browser extension first."
+
+
+class BrowserConnection:
+    """A connected browser extension and the requests waiting on its responses"""
+
+    def __init__(self, ws: WebSocketServerProtocol, client_id: str, group: Optional[str], max_in_flight: int,
+                 capabilities=()):
+        self.ws = ws
+        self.client_id = client_id
+        self.group = group
+        self.pending: dict[str, asyncio.Future] = {}
+        self.slots = asyncio.Semaphore(max_in_flight)
+        # Requests sent or waiting for a slot, and all requests routed here, for load balancing
+        self.in_flight = 0
+        self.routed = 0
+        # Optional message types the extension advertised when it connected
+        self.capabilities = set(capabilities)
+
+    def describe(self) -> dict:
+        return {"client_id": self.client_id, "group": self.group, "in_flight": self.in_flight}
+
 
 class Context:
-    def __init__(self):
-        self._ws: Optional[WebSocketServerProtocol] = None
-        self._pending_requests: dict[str, asyncio.Future] = {}
+    """Connected browser extensions, keyed by client id, and the requests sent to them.
+
+    Requests go to the browser named by ``client``: a client id, or a group
+    of equivalent browsers (the least busy one is used). Without ``client``
+    they go to the most recently connected browser.
+    """
+
+    def __init__(self, max_in_flight: int = MAX_IN_FLIGHT):
+        self.max_in_flight = max_in_flight
+        self._connections: dict[str, BrowserConnection] = {}
+        # Message ids only need to be unique among requests in flight
+        self._message_ids = itertools.count(1)
+        self._client_numbers = itertools.count(1)
+        # The WebSocket server's loop, which owns every connection
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
 
     @property
     def ws(self) -> WebSocketServerProtocol:
-        if not self._ws:
-            raise Exception("No connection to browser extension. Please connect your browser extension first.")
-        return self._ws
+        return self.connection().ws
+
+    def register(self, ws: WebSocketServerProtocol, client_id: str = None, group: str = None,
+                 capabilities=()) -> BrowserConnection:
+        """Add a browser connection; it replaces any earlier connection with the same client id.
+
+        ``capabilities`` names the optional message types (e.g. ``batch``) the extension supports.
+        """
+        # The replaced WebSocket is not closed explicitly. Closing it causes
+        # the browser extension to immediately reconnect, resulting in a
+        # connection-churn loop. Let the client decide when to disconnect instead.
+        self._loop = asyncio.get_running_loop()
+        client_id = client_id or f"browser-{next(self._client_numbers)}"
+        connection = BrowserConnection(ws, client_id, group, self.max_in_flight, capabilities)
+        self._connections.pop(client_id, None)
+        self._connections[client_id] = connection
+        return connection
+
+    def unregister(self, connection: BrowserConnection):
+        """Remove a disconnected browser, failing the requests still waiting on it."""
+        if self._connections.get(connection.client_id) is connection:
+            del self._connections[connection.client_id]
+        for future in connection.pending.values():
+            if not future.done():
+                future.set_exception(Exception("Browser extension disconnected"))
 
     def set_ws(self, ws: WebSocketServerProtocol):
-        """Set the active WebSocket connection."""
-        # Replace the active WebSocket without explicitly closing the old one.
-        # Closing it here causes the browser extension to immediately reconnect,
-        # resulting in a connection-churn loop. Let the client decide when to
-        # disconnect instead.
-        self._ws = ws
+        """Add a WebSocket connection as the default browser."""
+        self.register(ws)
 
     def has_ws(self) -> bool:
         """Check if we have an active WebSocket connection."""
-        return self._ws is not None
+        return bool(self._connections)
 
-    async def send_socket_message(self, message_type: str, payload: dict = None, timeout: float = 30.0) -> Any:
-        """Send a message to the browser extension and wait for response."""
-        if not self.has_ws():
-            raise Exception("No connection to browser extension. Please connect your browser extension first.")
-        
-        message_id = str(uuid.uuid4())
-        message = {
-            "id": message_id,
-            "type": message_type,
-            "payload": payload or {}
-        }
-        
-        # Create future for response
-        future = asyncio.Future()
-        self._pending_requests[message_id] = future
-        
+    def connections(self) -> list:
+        """The connected browsers, oldest first"""
+        return [connection.describe() for connection in list(self._connections.values())]
+
+    def connection(self, client: str = None) -> BrowserConnection:
+        """The browser a request for ``client`` goes to (see Context)"""
+        connections = list(self._connections.values())
+        if not connections:
+            raise Exception(NO_CONNECTION)
+        if client is None:
+            return connections[-1]
+        if client in self._connections:
+            return self._connections[client]
+        group = [connection for connection in connections if connection.group == client]
+        if not group:
+            raise Exception(f"No browser connected as '{client}'. Connected: "
+                            f"{', '.join(connection.client_id for connection in connections)}")
+        return min(group, key=lambda connection: (connection.in_flight, connection.routed))
+
+    async def _request(self, message_type: str, payload: dict, timeout: float, client: str = None) -> dict:
+        """Send one message and wait for the extension's response to it.
+
+        Any number of requests can be in flight at once; responses are
+        matched to them by message id in whatever order they arrive. Each
+        browser works on at most ``max_in_flight`` of them at a time.
+        """
+        if self._loop is not None and asyncio.get_running_loop() is not self._loop:
+            # Tools run on the MCP server's loop; the sockets and futures belong to the WebSocket server's
+            return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(
+                self._request(message_type, payload, timeout, client), self._loop))
+
+        connection = self.connection(client)
+        connection.in_flight += 1
+        connection.routed += 1
         try:
-            # Send message
-            await self.ws.send(json.dumps(message))
-            
-            # Wait for response with timeout
-            response = await asyncio.wait_for(future, timeout=timeout)
-            
-            if "error" in response:
-                raise Exception(f"Browser extension error: {response['error']}")
-            
-            return response.get("result")
-            
+            return await asyncio.wait_for(self._exchange(connection, message_type, payload), timeout=timeout)
         except asyncio.TimeoutError:
             raise Exception(f"Timeout waiting for response from browser extension")
         finally:
-            # Clean up pending request
-            self._pending_requests.pop(message_id, None)
+            connection.in_flight -= 1
+
+    async def _exchange(self, connection: BrowserConnection, message_type: str, payload: dict) -> dict:
+        async with connection.slots:
+            message_id = str(next(self._message_ids))
+            message = {
+                "id": message_id,
+                "type": message_type,
+                "payload": payload or {}
+            }
+
+            # Create future for response
+            future = asyncio.get_running_loop().create_future()
+            connection.pending[message_id] = future
+            try:
+                await connection.ws.send(json.dumps(message))
+                return await future
+            finally:
+                # Clean up pending request
+                connection.pending.pop(message_id, None)
+
+    async def send_socket_message(self, message_type: str, payload: dict = None, timeout: float = 30.0,
+                                  client: str = None) -> Any:
+        """Send a message to the browser extension and wait for response."""
+        response = await self._request(message_type, payload, timeout, client)
+        if "error" in response:
+            raise Exception(f"Browser extension error: {response['error']}")
+        return response.get("result")
 
-    def handle_response(self, message: dict):
+    async def batch(self, commands: list, timeout: float = 30.0, stop_on_error: bool = True,
+                    client: str = None) -> list:
+        """Run (message_type, payload) commands in order with one round trip.
+
+        The commands go to the extension in a single ``batch`` message, whose
+        result lists one ``{"result": ...}`` or ``{"error": ...}`` per
+        command. Like ``asyncio.gather(..., return_exceptions=True)``, returns
+        one entry per command: its result, or an Exception if it failed or
+        was skipped because an earlier one failed (with ``stop_on_error``).
+        ``timeout`` applies per command, so a batch gets one per command.
+        Extensions that did not advertise the ``batch`` capability when they
+        connected get the commands one at a time. A top-level error fails
+        every command, since it is unknown which of them ran.
+        """
+        commands = [{"type": message_type, "payload": payload or {}} for message_type, payload in commands]
+        if not commands:
+            return []
+        # Every command goes to the same browser, even when client names a group
+        connection = self.connection(client)
+        client = connection.client_id
+        if "batch" in connection.capabilities:
+            response = await self._request(
+                "batch", {"commands": commands, "stop_on_error": stop_on_error}, timeout * len(commands), client)
+            if "error" in response:
+                return [Exception(f"Browser extension error: {response['error']}") for _ in commands]
+            responses = response.get("result") or []
+            results = []
+            for i in range(len(commands)):
+                if i >= len(responses):
+                    results.append(Exception("Skipped after an earlier command failed"))
+                elif "error" in responses[i]:
+                    results.append(Exception(f"Browser extension error: {responses[i]['error']}"))
+                else:
+                    results.append(responses[i].get("result"))
+            return results
+
+        results = []
+        for command in commands:
+            if stop_on_error and results and isinstance(results[-1], Exception):
+                results.append(Exception("Skipped after an earlier command failed"))
+                continue
+            try:
+                results.append(await self.send_socket_message(command["type"], command["payload"], timeout, client))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def handle_binary_response(self, frame: bytes, connection: BrowserConnection = None):
+        """Handle a binary response from browser extension.
+
+        The frame is a 4-byte big-endian header length, a JSON header like a
+        text response plus ``"binary": {"path": [...], "mime_type": ...}``,
+        then raw bytes (e.g. a PNG). The bytes go into the result at ``path``
+        (default ``["data"]``) as a memoryview of the frame, without copying
+        or base64, and the MIME type next to them as ``mime_type``.
+        """
+        view = memoryview(frame)
+        header_length = int.from_bytes(view[:4], "big")
+        message = json.loads(bytes(view[4:4 + header_length]))
+        binary = message.pop("binary", None) or {}
+        path = binary.get("path") or ["data"]
+        container = message.setdefault("result", {})
+        for key in path[:-1]:
+            container = container.setdefault(key, {})
+        container[path[-1]] = view[4 + header_length:]
+        if binary.get("mime_type"):
+            container["mime_type"] = binary["mime_type"]
+        self.handle_response(message, connection)
+
+    def handle_response(self, message: dict, connection: BrowserConnection = None):
         """Handle incoming response from browser extension."""
         message_id = message.get("id")
-        if message_id in self._pending_requests:
-            future = self._pending_requests[message_id]
-            if not future.done():
-                future.set_result(message)
+        connections = [connection] if connection is not None else list(self._connections.values())
+        for connection in connections:
+            future = connection.pending.get(message_id)
+            if future is not None:
+                if not future.done():
+                    future.set_result(message)
+                return
 
     async def close(self):
-        """Close the WebSocket connection."""
-        if self._ws:
-            await self._ws.close()
-            self._ws = None 
\ No newline at end of file
+        """Close every WebSocket connection."""
+        for connection in list(self._connections.values()):
+            await connection.ws.close()
+            self.unregister(connection)
@@ -16,13 +16,14 @@ import json
 import uvicorn
 import socket
 from contextlib import closing
-from fastapi.responses import FileResponse
 import os
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi import FastAPI, Request, Response
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import FastMCP, Image
 
+from analytics_feed import AnalyticsFeed, AnalyticsSnapshot
 from context import Context
 from ws_server import start_websocket_server
 from tools.browser import (
@@ -39,8 +40,15 @@ from tools.browser import (
     grab_dom_tool,
     capture_with_highlights_tool,
     add_assistant_message_tool,
+    run_browser_actions_tool,
+    list_browsers_tool,
     query_history_by_date_tool,
-    generate_browsing_analytics_tool
+    search_history_tool,
+    generate_browsing_analytics_tool,
+    browsing_analytics,
+    browsing_activity,
+    search_history as search_history_pages,
+    get_history_store
 )
 
 # Configure logging
@@ -54,6 +62,7 @@ logger = logging.getLogger(__name__)
 mcp = FastMCP("dex-browser")
 context = Context()
 ws_server = None
+analytics_feed = AnalyticsFeed(browsing_analytics, get_history_store)
 
 # Add FastAPI app for REST endpoints
 rest_app = FastAPI()
@@ -72,110 +81,148 @@ rest_app.add_middleware(
 )
 
 @mcp.tool()
-async def get_tabs() -> str:
+async def get_tabs(client: str = None) -> str:
     """Get all open browser tabs."""
-    return await get_tabs_tool(context)
+    return await get_tabs_tool(context, {"client": client})
+
+
+def image_content(result):
+    """A capture whose image arrived as raw bytes, as MCP image content plus the rest of the result as JSON
+
+    Other results (errors, data URLs from extensions without binary frames) are returned unchanged.
+    """
+    if not isinstance(result, dict):
+        return result
+    for container in (result, result.get("data")):
+        if not isinstance(container, dict):
+            continue
+        for key, value in container.items():
+            if isinstance(value, memoryview):
+                details = {name: item for name, item in container.items() if name != key}
+                if container is not result:
+                    details = {**result, "data": details}
+                image_format = container.get("mime_type", "image/png").split("/")[-1]
+                return [Image(data=value, format=image_format), json.dumps(details)]
+    return result
 
 
 @mcp.tool()
-async def screenshot() -> str:
+async def screenshot(client: str = None):
     """Take a screenshot of the active tab."""
-    return await screenshot_tool(context)
+    return image_content(await screenshot_tool(context, {"client": client}))
 
 
 @mcp.tool()
-async def navigate(url: str) -> str:
+async def navigate(url: str, client: str = None) -> str:
     """Navigate to a URL in active tab or specified tab."""
-    return await navigate_tool(context, {"url": url})
+    return await navigate_tool(context, {"url": url, "client": client})
 
 
 @mcp.tool()
-async def navigate_tab(url: str, tab_id: int) -> str:
+async def navigate_tab(url: str, tab_id: int, client: str = None) -> str:
     """Navigate to a URL in a specific tab."""
-    return await navigate_tool(context, {"url": url, "tab_id": tab_id})
+    return await navigate_tool(context, {"url": url, "tab_id": tab_id, "client": client})
 
 
 @mcp.tool()
-async def select_tab(tab_id: int) -> str:
+async def select_tab(tab_id: int, client: str = None) -> str:
     """Switch to a specific browser tab by ID."""
-    return await select_tab_tool(context, {"tab_id": tab_id})
+    return await select_tab_tool(context, {"tab_id": tab_id, "client": client})
 
 
 @mcp.tool()
-async def new_tab(url: str = None) -> str:
+async def new_tab(url: str = None, client: str = None) -> str:
     """Create a new browser tab, optionally with a specific URL."""
-    params = {}
+    params = {"client": client}
     if url:
         params["url"] = url
     return await new_tab_tool(context, params)
 
 
 @mcp.tool()
-async def close_tab(tab_id: int = None) -> str:
+async def close_tab(tab_id: int = None, client: str = None) -> str:
     """Close a browser tab by ID, or close the active tab if no ID specified."""
-    params = {}
+    params = {"client": client}
     if tab_id is not None:
         params["tab_id"] = tab_id
     return await close_tab_tool(context, params)
 
 
 @mcp.tool()
-async def search_google(query: str, tab_id: int = None) -> str:
+async def search_google(query: str, tab_id: int = None, client: str = None) -> str:
     """Perform a Google search in active tab or specified tab."""
-    params = {"query": query}
+    params = {"query": query, "client": client}
     if tab_id is not None:
         params["tab_id"] = tab_id
     return await search_google_tool(context, params)
 
 
 @mcp.tool()
-async def click_element(element_id: str, tab_id: int = None) -> str:
+async def click_element(element_id: str, tab_id: int = None, client: str = None) -> str:
     """Click on a DOM element by its ID."""
-    params = {"element_id": element_id}
+    params = {"element_id": element_id, "client": client}
     if tab_id is not None:
         params["tab_id"] = tab_id
     return await click_element_tool(context, params)
 
 
 @mcp.tool()
-async def input_text(element_id: str, text: str, tab_id: int = None) -> str:
+async def input_text(element_id: str, text: str, tab_id: int = None, client: str = None) -> str:
     """Type text into a DOM element by its ID."""
-    params = {"element_id": element_id, "text": text}
+    params = {"element_id": element_id, "text": text, "client": client}
     if tab_id is not None:
         params["tab_id"] = tab_id
     return await input_text_tool(context, params)
 
 
 @mcp.tool()
-async def send_keys(keys: str, tab_id: int = None) -> str:
+async def send_keys(keys: str, tab_id: int = None, client: str = None) -> str:
     """Send keyboard shortcuts or key combinations to the page."""
-    params = {"keys": keys}
+    params = {"keys": keys, "client": client}
     if tab_id is not None:
         params["tab_id"] = tab_id
     return await send_keys_tool(context, params)
 
 
 @mcp.tool()
-async def grab_dom(tab_id: int = None) -> str:
+async def grab_dom(tab_id: int = None, client: str = None) -> str:
     """Get formatted DOM structure with XPath mappings for elements."""
-    params = {}
+    params = {"client": client}
     if tab_id is not None:
         params["tab_id"] = tab_id
     return await grab_dom_tool(context, params)
 
 
 @mcp.tool()
-async def capture_with_highlights(tab_id: int = None) -> str:
+async def capture_with_highlights(tab_id: int = None, client: str = None):
     """Take a screenshot with element highlights for better AI understanding."""
-    params = {}
+    params = {"client": client}
     if tab_id is not None:
         params["tab_id"] = tab_id
-    return await capture_with_highlights_tool(context, params)
+    return image_content(await capture_with_highlights_tool(context, params))
 
 @mcp.tool()
-async def add_assistant_message(message: str) -> str:
+async def add_assistant_message(message: str, client: str = None) -> str:
     """Manually add a message from the assistant to the chat."""
-    return await add_assistant_message_tool(context, {"message": message})
+    return await add_assistant_message_tool(context, {"message": message, "client": client})
+
+
+@mcp.tool()
+async def run_browser_actions(actions: list[dict], stop_on_error: bool = True, client: str = None) -> str:
+    """Run several browser actions in order with one round trip, e.g. grab_dom, click_element, grab_dom.
+
+    Each action is a dict naming the tool in "action" plus that tool's parameters,
+    e.g. {"action": "input_text", "element_id": "12", "text": "hello"}. Returns each step's result.
+    """
+    return await run_browser_actions_tool(context, {"actions": actions, "stop_on_error": stop_on_error,
+                                                    "client": client})
+
+
+@mcp.tool()
+async def list_browsers() -> str:
+    """List the connected browsers. Pass a browser's client id, or a group of equivalent browsers,
+    as the client parameter of the other browser tools to choose where they run."""
+    return await list_browsers_tool(context)
 
 
 @mcp.tool(
@@ -185,6 +232,7 @@ async def add_assistant_message(message: str) -> str:
         "This tool retrieves the user's browsing history for ANY date-related query about web browsing. "
         "Keywords that should trigger this tool: 'browsing history', 'websites', 'visited', 'history', 'sites', 'links', 'opened', 'accessed', 'browse', 'went to'. "
         "Date formats supported: YYYY-MM-DD (e.g., '2025-05-24') or natural language (e.g., 'May 24th, 2025'). "
+        "For a week or any other range, pass the first day as date and the last day as end_date. "
         "ALWAYS use this tool for browsing history queries instead of saying you don't have access to browsing data. "
         "Example queries that MUST use this tool: "
         "'What websites did I visit on 2025-05-24?', "
@@ -194,7 +242,7 @@ async def add_assistant_message(message: str) -> str:
         "'What did I browse on May 22nd, 2025?'."
     )
 )
-async def query_history_by_date(date: str) -> str:
+async def query_history_by_date(date: str, end_date: str = None) -> str:
     """
     Retrieve a summary of your browsing history for a specific date.
 
@@ -208,15 +256,47 @@ async def query_history_by_date(date: str) -> str:
 
     Parameters:
     - date (str): The date to search for, in YYYY-MM-DD format (e.g., '2025-05-24').
+    - end_date (str, optional): Last date of a range starting at date (e.g., '2025-05-30' for a week).
 
     Returns:
     - A formatted summary listing each URL, the number of visits, and a brief content summary for that date.
     """
-    logging.info(f"query_history_by_date tool called with date={date}")
-    return await query_history_by_date_tool(context, {"date": date})
+    logging.info(f"query_history_by_date tool called with date={date} end_date={end_date}")
+    return await query_history_by_date_tool(context, {"date": date, "end_date": end_date})
+
+@mcp.tool(
+    name="search_history",
+    description=(
+        "Use this tool when a user asks where they saw something, or for pages about a topic, in their browsing history "
+        "(e.g. 'where did I read that article about X?', 'find the docs page on Y I opened last week'). "
+        "It searches the URL, title and text of every page visited and returns the best matches with snippets. "
+        "Put exact phrases in double quotes. Optionally narrow by domain (e.g. 'github.com') "
+        "and by the dates the page was visited (YYYY-MM-DD). "
+        "For what was visited on a date, use query_history_by_date instead."
+    )
+)
+async def search_history(query: str, domain: str = None, start_date: str = None, end_date: str = None,
+                         limit: int = 10) -> str:
+    """
+    Full-text search over your browsing history.
+
+    Parameters:
+    - query (str): Words to search for; "quoted phrases" must appear as written.
+    - domain (str, optional): Only pages on this site, including its subdomains.
+    - start_date (str, optional): Only pages visited on or after this date (YYYY-MM-DD).
+    - end_date (str, optional): Only pages visited on or before this date (YYYY-MM-DD).
+    - limit (int, optional): Most results to return (default 10).
+
+    Returns:
+    - The matching pages, best first, each with its title, URL, visits and a snippet of the matching text.
+    """
+    logging.info(f"search_history tool called with query={query!r} domain={domain}")
+    return await search_history_tool(context, {"query": query, "domain": domain, "start_date": start_date,
+                                               "end_date": end_date, "limit": limit})
 
 @mcp.tool()
-def generate_browsing_analytics(output_file: str = "data/browsing_analytics.json") -> str:
+def generate_browsing_analytics(output_file: str = "data/browsing_analytics.json",
+                                start_date: str = None, end_date: str = None) -> str:
     """
     Analyze what you search for most and your browsing patterns with website frequency data.
     
@@ -234,11 +314,13 @@ def generate_browsing_analytics(output_file: str = "data/browsing_analytics.json
     
     Args:
         output_file: Path where the analytics JSON file will be saved (default: data/browsing_analytics.json)
+        start_date: Optional start of the time window, YYYY-MM-DD or an ISO datetime (default: all history)
+        end_date: Optional end of the time window; a date is inclusive (default: all history)
     
     Returns:
         JSON with domain_frequency and category_breakdown data including percentages for pie charts
     """
-    return generate_browsing_analytics_tool(output_file)
+    return generate_browsing_analytics_tool(output_file, start_date, end_date)
 
 
 @rest_app.post("/api/query_history_by_date")
@@ -249,7 +331,7 @@ async def query_history_by_date_api(request: Request):
         if not date:
             return {"error": "Date parameter is required"}, 400
         
-        result = await query_history_by_date_tool(context, {"date": date})
+        result = await query_history_by_date_tool(context, {"date": date, "end_date": body.get("end_date")})
         return {"result": result}
     except json.JSONDecodeError:
         return {"error": "Invalid JSON in request body"}, 400
@@ -258,12 +340,64 @@ async def query_history_by_date_api(request: Request):
         return {"error": "Internal server error"}, 500
 
 
+@rest_app.on_event("startup")
+async def start_analytics_feed():
+    # Runs on the REST app's own event loop, which serves the analytics stream
+    asyncio.create_task(analytics_feed.watch())
+
+
+def snapshot_response(request: Request, snapshot: AnalyticsSnapshot) -> Response:
+    headers = {'ETag': snapshot.etag, 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+    if snapshot.matches(request.headers.get('if-none-match', '')):
+        return Response(status_code=304, headers=headers)
+    body, coding = snapshot.encoded(request.headers.get('accept-encoding', ''))
+    if coding:
+        headers['Content-Encoding'] = coding
+    return Response(body, media_type='application/json', headers=headers)
+
+
 @rest_app.get("/api/browsing_analytics")
-async def get_browsing_analytics():
-    analytics_path = "../../data/browsing_analytics.json"
-    if not os.path.exists(analytics_path):
-        return {"error": "Analytics data not available"}, 404
-    return FileResponse(analytics_path, media_type="application/json")
+async def get_browsing_analytics(request: Request, start_date: str = None, end_date: str = None):
+    # All-history analytics come from the feed's snapshot, rebuilt only when the history changes
+    try:
+        if start_date or end_date:
+            analytics = await asyncio.to_thread(browsing_analytics, start_date=start_date, end_date=end_date)
+            snapshot = AnalyticsSnapshot(analytics)
+        else:
+            snapshot = await analytics_feed.current()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid time window: {e}")
+    if snapshot.analytics is None:
+        raise HTTPException(status_code=404, detail="Analytics data not available")
+    return snapshot_response(request, snapshot)
+
+
+@rest_app.get("/api/browsing_activity")
+async def get_browsing_activity(granularity: str = "day", start_date: str = None, end_date: str = None,
+                                by: str = "category"):
+    # Served from the hour/day/week rollups, so any range costs what it returns
+    try:
+        return await asyncio.to_thread(browsing_activity, granularity, start_date, end_date, by or None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid activity query: {e}")
+
+
+@rest_app.get("/api/search_history")
+async def search_history_api(q: str, domain: str = None, start_date: str = None, end_date: str = None,
+                             limit: int = 20):
+    # Full-text search over page URLs, titles and content, best match first
+    try:
+        results = await asyncio.to_thread(search_history_pages, q, domain, start_date, end_date, min(limit, 100))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid search: {e}")
+    return {"query": q, "results": results}
+
+
+@rest_app.get("/api/browsing_analytics/stream")
+async def stream_browsing_analytics():
+    # Server-sent events: the current analytics, then again whenever they change
+    return StreamingResponse(analytics_feed.updates(), media_type="text/event-stream",
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 
 async def start_background_services():
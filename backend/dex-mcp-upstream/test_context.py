@@ -0,0 +1,71 @@
+"""Tests for batched commands in Context.batch."""
+import asyncio
+import json
+
+from context import Context
+
+
+class FakeExtension:
+    """Stands in for an extension's WebSocket: answers each message with ``reply(message)``"""
+
+    def __init__(self, context, reply, delay=0.0):
+        self.context = context
+        self.reply = reply
+        self.delay = delay
+        self.sent = []
+
+    async def send(self, raw):
+        message = json.loads(raw)
+        self.sent.append(message)
+        response = {"id": message["id"], **self.reply(message)}
+        commands = len(message["payload"].get("commands", [None]))
+        asyncio.get_running_loop().call_later(self.delay * commands, self.context.handle_response, response)
+
+
+def run_batch(reply, commands, capabilities=("batch",), delay=0.0, timeout=30.0):
+    async def go():
+        context = Context()
+        extension = FakeExtension(context, reply, delay)
+        context.register(extension, "test", capabilities=capabilities)
+        first = await context.batch(commands, timeout=timeout)
+        second = await context.batch(commands, timeout=timeout)
+        return first, second, extension.sent
+    return asyncio.run(go())
+
+
+COMMANDS = [("click_element", {"element_id": "5"}), ("input_text", {"element_id": "6", "text": "hi"})]
+
+
+def test_batch_results():
+    def reply(message):
+        return {"result": [{"result": {"success": True}}, {"error": "Element 6 not found"}]}
+    first, _, sent = run_batch(reply, COMMANDS)
+    assert first[0] == {"success": True}
+    assert isinstance(first[1], Exception) and "Element 6 not found" in str(first[1])
+    assert [message["type"] for message in sent] == ["batch", "batch"]
+
+
+def test_extension_without_batch_capability_gets_single_commands():
+    def reply(message):
+        assert message["type"] != "batch"
+        return {"result": {"success": True, "type": message["type"]}}
+    first, second, sent = run_batch(reply, COMMANDS, capabilities=())
+    assert first == second == [{"success": True, "type": "click_element"}, {"success": True, "type": "input_text"}]
+    assert [message["type"] for message in sent] == ["click_element", "input_text", "click_element", "input_text"]
+
+
+def test_batch_timeout_scales_with_commands():
+    def reply(message):
+        return {"result": [{"result": {"success": True}}] * len(message["payload"]["commands"])}
+    # Each command takes 0.1s against a 0.15s timeout, so only a per-command timeout lets three through
+    first, _, _ = run_batch(reply, COMMANDS + [("grab_dom", {})], delay=0.1, timeout=0.15)
+    assert first == [{"success": True}] * 3
+
+
+def test_batch_error_is_not_retried():
+    def reply(message):
+        return {"error": "Tab was closed during batch"}
+    first, second, sent = run_batch(reply, COMMANDS)
+    assert all(isinstance(result, Exception) and "Tab was closed" in str(result) for result in first + second)
+    # The commands may have partly run, so they are never re-sent one by one
+    assert [message["type"] for message in sent] == ["batch", "batch"]
@@ -2,21 +2,62 @@
 
 from typing import Any, Dict
 from context import Context
+import asyncio
 import json
-from datetime import datetime
+from datetime import datetime, timezone
 import os
-from urllib.parse import urlparse
-from collections import defaultdict, Counter
-import re
+import sys
+
+# backend/ holds the browseiq_common package shared with url_scraping
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if BACKEND_DIR not in sys.path:
+    sys.path.append(BACKEND_DIR)
+
+from browseiq_common.history_frame import HistoryFrame, window_bound
+from browseiq_common.history_index import HistoryDateIndex
+from browseiq_common.history_store import HOUR_MS, LEGACY_CONTENTS_PATH, HistoryStore
+
+_history_store = None
+_history_index = None
+_history_frame = None
+
+
+def get_history_store() -> HistoryStore:
+    """Open the shared history store once, importing the legacy contents.json into it if empty"""
+    global _history_store
+    if _history_store is None:
+        store = HistoryStore()
+        if not len(store) and os.path.exists(LEGACY_CONTENTS_PATH):
+            with open(LEGACY_CONTENTS_PATH, 'r', encoding='utf-8') as f:
+                store.import_contents(json.load(f))
+        _history_store = store
+    return _history_store
+
+
+def get_history_index() -> HistoryDateIndex:
+    """Visits by date, built on first use and refreshed from the store as it changes"""
+    global _history_index
+    if _history_index is None:
+        _history_index = HistoryDateIndex(get_history_store())
+    return _history_index
+
+
+def get_history_frame() -> HistoryFrame:
+    """Visits as NumPy columns for windowed analytics, loaded on first use and refreshed as the store changes"""
+    global _history_frame
+    if _history_frame is None:
+        _history_frame = HistoryFrame(get_history_store())
+    return _history_frame
 
 
 async def get_tabs_tool(context: Context, params: Dict[str, Any] = None) -> str:
     """Get all open browser tabs.
     
-    Params: None
+    Params:
+        client (str): Optional - Browser client id or group, defaults to the most recently connected browser
     """
     try:
-        result = await context.send_socket_message("get_tabs", {})
+        result = await context.send_socket_message("get_tabs", {}, client=(params or {}).get("client"))
         
         if not result or "tabs" not in result:
             return "No tabs found or unable to fetch tabs."
@@ -42,10 +83,13 @@ async def get_tabs_tool(context: Context, params: Dict[str, Any] = None) -> str:
 async def screenshot_tool(context: Context, params: Dict[str, Any] = None) -> str:
     """Take a screenshot of the active tab.
     
-    Params: None
+    Params:
+        client (str): Optional - Browser client id or group, defaults to the most recently connected browser
     """
     try:
-        result = await context.send_socket_message("screenshot", {})
+        # Extensions that support it send the image as raw bytes (see Context.handle_binary_response)
+        result = await context.send_socket_message("screenshot", {"accept_binary": True},
+                                                   client=(params or {}).get("client"))
         
         if not result:
             return "Failed to take screenshot."
@@ -65,6 +109,7 @@ async def navigate_tool(context: Context, params: Dict[str, Any] = None) -> str:
     Params:
         url (str): Required - URL to navigate to
         tab_id (int): Optional - Specific tab ID, defaults to active tab
+        client (str): Optional - Browser client id or group, defaults to the most recently connected browser
     """
     if not params or "url" not in params:
         return "Error: URL parameter is required"
@@ -77,7 +122,7 @@ async def navigate_tool(context: Context, params: Dict[str, Any] = None) -> str:
         payload["tab_id"] = tab_id
     
     try:
-        result = await context.send_socket_message("navigate", payload)
+        result = await context.send_socket_message("navigate", payload, client=params.get("client"))
         
         if not result:
             return f"Failed to navigate to {url}"
@@ -98,6 +143,7 @@ async def select_tab_tool(context: Context, params: Dict[str, Any] = None) -> st
     
     Params:
         tab_id (int): Required - Tab ID to switch to
+        client (str): Optional - Browser client id or group, defaults to the most recently connected browser
     """
     if not params or "tab_id" not in params:
         return "Error: tab_id parameter is required"
@@ -105,7 +151,8 @@ async def select_tab_tool(context: Context, params: Dict[str, Any] = None) -> st
     tab_id = params["tab_id"]
     
     try:
-        result = await context.send_socket_message("select_tab", {"tab_id": tab_id})
+        result = await context.send_socket_message("select_tab", {"tab_id": tab_id},
+                                                   client=params.get("client"))
         
         if not result:
             return f"Failed to select tab {tab_id}"
@@ -126,6 +173,7 @@ async def new_tab_tool(context: Context, params: Dict[str, Any] = None) -> str:
     
     Params:
         url (str): Optional - URL to open in new tab, defaults to blank tab
+        client (str): Optional - Browser client id or group, defaults to the most recently connected browser
     """
     url = params.get("url") if params else None
     
@@ -134,7 +182,7 @@ async def new_tab_tool(context: Context, params: Dict[str, Any] = None) -> str:
         payload["url"] = url
     
     try:
-        result = await context.send_socket_message("new_tab", payload)
+        result = await context.send_socket_message("new_tab", payload, client=(params or {}).get("client"))
         
         if not result:
             return "Failed to create new tab"
@@ -160,6 +208,7 @@ async def close_tab_tool(context: Context, params: Dict[str, Any] = None) -> str
     
     Params:
         tab_id (int): Optional - Tab ID to close, defaults to active tab
+        client (str): Optional - Browser client id or group, defaults to the most recently connected browser
     """
     tab_id = params.get("tab_id") if params else None
     
@@ -168,7 +217,7 @@ async def close_tab_tool(context: Context, params: Dict[str, Any] = None) -> str
         payload["tab_id"] = tab_id
     
     try:
-        result = await context.send_socket_message("close_tab", payload)
+        result = await context.send_socket_message("close_tab", payload, client=(params or {}).get("client"))
         
         if not result:
             return f"Failed to close tab {tab_id if tab_id else '(active)'}"
@@ -190,6 +239,7 @@ async def search_google_tool(context: Context, params: Dict[str, Any] = None) ->
     Params:
         query (str): Required - Search query text
         tab_id (int): Optional - Specific tab ID, defaults to active tab
+        client (str): Optional - Browser client id or group, defaults to the most recently connected browser
     """
     if not params or "query" not in params:
         return "Error: query parameter is required"
@@ -202,7 +252,7 @@ async def search_google_tool(context: Context, params: Dict[str, Any] = None) ->
         payload["tab_id"] = tab_id
     
     try:
-        result = await context.send_socket_message("search_google", payload)
+        result = await context.send_socket_message("search_google", payload, client=params.get("client"))
         
         if not result:
             return f"Failed to search Google for '{query}'"
@@ -224,6 +274,7 @@ async def click_element_tool(context: Context, params: Dict[str, Any] = None) ->
     Params:
         element_id (str): Required - Element ID to click
         tab_id (int): Optional - Specific tab ID, defaults to active tab
+        client (str): Optional - Browser client id or group, defaults to the most recently connected browser
     """
     if not params or "element_id" not in params:
         return "Error: element_id parameter is required"
@@ -236,7 +287,7 @@ async def click_element_tool(context: Context, params: Dict[str, Any] = None) ->
         payload["tab_id"] = tab_id
     
     try:
-        result = await context.send_socket_message("click_element", payload)
+        result = await context.send_socket_message("click_element", payload, client=params.get("client"))
         
         if not result:
             return f"Failed to click element '{element_id}'"
@@ -259,6 +310,7 @@ async def input_text_tool(context: Context, params: Dict[str, Any] = None) -> st
         element_id (str): Required - Element ID to type into
         text (str): Required - Text to input
         tab_id (int): Optional - Specific tab ID, defaults to active tab
+        client (str): Optional - Browser client id or group, defaults to the most recently connected browser
     """
     if not params or "element_id" not in params or "text" not in params:
         return "Error: element_id and text parameters are required"
@@ -272,7 +324,7 @@ async def input_text_tool(context: Context, params: Dict[str, Any] = None) -> st
         payload["tab_id"] = tab_id
     
     try:
-        result = await context.send_socket_message("input_text", payload)
+        result = await context.send_socket_message("input_text", payload, client=params.get("client"))
         
         if not result:
             return f"Failed to input text into element '{element_id}'"
@@ -294,6 +346,7 @@ async def send_keys_tool(context: Context, params: Dict[str, Any] = None) -> str
     Params:
         keys (str): Required - Key combination (e.g. 'Ctrl+C', 'Enter', 'Tab')
         tab_id (int): Optional - Specific tab ID, defaults to active tab
+        client (str): Optional - Browser client id or group, defaults to the most recently connected browser
     """
     if not params or "keys" not in params:
         return "Error: keys parameter is required"
@@ -306,7 +359,7 @@ async def send_keys_tool(context: Context, params: Dict[str, Any] = None) -> str
         payload["tab_id"] = tab_id
     
     try:
-        result = await context.send_socket_message("send_keys", payload)
+        result = await context.send_socket_message("send_keys", payload, client=params.get("client"))
         
         if not result:
             return f"Failed to send keys '{keys}'"
@@ -327,6 +380,7 @@ async def grab_dom_tool(context: Context, params: Dict[str, Any] = None) -> str:
     
     Params:
         tab_id (int): Optional - Specific tab ID, defaults to active tab
+        client (str): Optional - Browser client id or group, defaults to the most recently connected browser
     """
     tab_id = params.get("tab_id") if params else None
     
@@ -335,7 +389,7 @@ async def grab_dom_tool(context: Context, params: Dict[str, Any] = None) -> str:
         payload["tab_id"] = tab_id
     
     try:
-        result = await context.send_socket_message("grab_dom", payload)
+        result = await context.send_socket_message("grab_dom", payload, client=(params or {}).get("client"))
         
         if not result:
             return "Failed to grab DOM structure"
@@ -354,15 +408,18 @@ async def capture_with_highlights_tool(context: Context, params: Dict[str, Any]
     
     Params:
         tab_id (int): Optional - Specific tab ID, defaults to active tab
+        client (str): Optional - Browser client id or group, defaults to the most recently connected browser
     """
     tab_id = params.get("tab_id") if params else None
     
-    payload = {}
+    # Extensions that support it send the image as raw bytes (see Context.handle_binary_response)
+    payload = {"accept_binary": True}
     if tab_id is not None:
         payload["tab_id"] = tab_id
     
     try:
-        result = await context.send_socket_message("capture_with_highlights", payload)
+        result = await context.send_socket_message("capture_with_highlights", payload,
+                                                   client=(params or {}).get("client"))
         
         if not result:
             return "Failed to capture screenshot with highlights"
@@ -381,6 +438,7 @@ async def add_assistant_message_tool(context: Context, params: Dict[str, Any] =
     
     Params:
         message (str): Required - Message to add to the chat
+        client (str): Optional - Browser client id or group, defaults to the most recently connected browser
     """
     if not params or "message" not in params:
         return "Error: message parameter is required"
@@ -388,7 +446,8 @@ async def add_assistant_message_tool(context: Context, params: Dict[str, Any] =
     message = params["message"]
     
     try:
-        result = await context.send_socket_message("add_assistant_message", {"message": message})
+        result = await context.send_socket_message("add_assistant_message", {"message": message},
+                                                   client=params.get("client"))
         
         if not result:
             return f"Failed to add assistant message"
@@ -402,16 +461,93 @@ async def add_assistant_message_tool(context: Context, params: Dict[str, Any] =
         return f"Error adding assistant message: {str(e)}"
 
 
+async def list_browsers_tool(context: Context, params: Dict[str, Any] = None) -> str:
+    """List the connected browser extensions.
+
+    Params: None
+    """
+    browsers = context.connections()
+    if not browsers:
+        return "No browsers connected."
+
+    browser_list = []
+    for browser in browsers:
+        browser_info = f"- {browser['client_id']}"
+        if browser['group']:
+            browser_info += f" (group {browser['group']})"
+        browser_list.append(browser_info + f", {browser['in_flight']} requests in flight")
+    return f"{len(browsers)} connected browsers (the last is the default):\n" + "\n".join(browser_list)
+
+
+# Browser actions run_browser_actions_tool accepts, with their required parameters
+BROWSER_ACTIONS = {
+    "get_tabs": (),
+    "screenshot": (),
+    "navigate": ("url",),
+    "select_tab": ("tab_id",),
+    "new_tab": (),
+    "close_tab": (),
+    "search_google": ("query",),
+    "click_element": ("element_id",),
+    "input_text": ("element_id", "text"),
+    "send_keys": ("keys",),
+    "grab_dom": (),
+    "capture_with_highlights": (),
+}
+
+
+async def run_browser_actions_tool(context: Context, params: Dict[str, Any] = None) -> str:
+    """Run several browser actions in order with a single round trip to the extension.
+
+    Params:
+        actions (list): Required - Steps like {"action": "click_element", "element_id": "5"},
+            each with the parameters of that action's tool
+        stop_on_error (bool): Optional - Skip the remaining steps after one fails, defaults to True
+        client (str): Optional - Browser client id or group, defaults to the most recently connected browser
+    """
+    if not params or not params.get("actions"):
+        return "Error: actions parameter is required"
+
+    commands = []
+    for number, step in enumerate(params["actions"], 1):
+        step = dict(step)
+        action = step.pop("action", None)
+        if action not in BROWSER_ACTIONS:
+            return f"Error: step {number} has unknown action '{action}'. Use one of: {', '.join(BROWSER_ACTIONS)}"
+        missing = [name for name in BROWSER_ACTIONS[action] if name not in step]
+        if missing:
+            return f"Error: step {number} ({action}) needs {', '.join(missing)}"
+        commands.append((action, {name: value for name, value in step.items() if value is not None}))
+
+    try:
+        results = await context.batch(commands, stop_on_error=params.get("stop_on_error", True),
+                                      client=params.get("client"))
+    except Exception as e:
+        return f"Error running browser actions: {str(e)}"
+
+    lines = []
+    for number, ((action, _), result) in enumerate(zip(commands, results), 1):
+        if isinstance(result, Exception):
+            lines.append(f"{number}. {action}: {str(result)}")
+        elif isinstance(result, dict) and result.get("success") is False:
+            lines.append(f"{number}. {action}: Failed: {result.get('error', 'Unknown error')}")
+        else:
+            lines.append(f"{number}. {action}: {json.dumps(result)}")
+    return "\n\n".join(lines)
+
+
 async def query_history_by_date_tool(context: Context, params: Dict[str, Any] = None) -> str:
-    """Query browsing history for a specific date and return matching items with summaries.
+    """Query browsing history for a specific date (or date range) and return matching items with summaries.
     
     Params:
         date (str): Required - Date in YYYY-MM-DD format or natural language (e.g., "May 24th, 2025")
+        end_date (str): Optional - Last date of a range starting at date, in the same formats
     """
     if not params or "date" not in params:
         return "Error: date parameter is required (format: YYYY-MM-DD or natural language like 'May 24th, 2025')"
     
     date_str = params["date"]
+    end_date_str = params.get("end_date")
     
     try:
         # Try to convert natural language dates to YYYY-MM-DD format
@@ -427,43 +563,31 @@ async def query_history_by_date_tool(context: Context, params: Dict[str, Any] =
         normalized_date = date_str.lower().strip()
         if normalized_date in date_conversions:
             date_str = date_conversions[normalized_date]
+        if end_date_str and end_date_str.lower().strip() in date_conversions:
+            end_date_str = date_conversions[end_date_str.lower().strip()]
         
         # Validate date format
         query_date = datetime.strptime(date_str, '%Y-%m-%d')
-        
-        # Load history data from contents.json
-        data_file = "../../data/contents.json"
-        if not os.path.exists(data_file):
-            # Try alternative path
-            data_file = "../data/contents.json"
-            if not os.path.exists(data_file):
-                return f"Browsing history data file not found. Checked paths: ../../data/contents.json and ../data/contents.json"
-        
-        with open(data_file, 'r', encoding='utf-8') as f:
-            history_data = json.load(f)
-        
-        # Filter items for the specified date
-        matching_items = []
-        search_queries = []
-        
-        for item in history_data:
-            item_date = datetime.strptime(item['timestamp'].split('T')[0], '%Y-%m-%d')
-            if item_date.date() == query_date.date():
-                matching_items.append(item)
-                
-                # Extract search queries from Google searches
-                content = item.get('content', '')
-                if 'Google search:' in content:
-                    query = content.replace('Google search:', '').strip()
-                    if query:
-                        search_queries.append(query)
+        end_date = datetime.strptime(end_date_str, '%Y-%m-%d') if end_date_str else query_date
+        
+        # Served from the in-memory date index; building or refreshing it reads the store, so off the event loop
+        start, end = query_date.date().isoformat(), end_date.date().isoformat()
+        matching_items = await asyncio.to_thread(lambda: get_history_index().visits_between(start, end))
+        if end != start:
+            date_str = f"{date_str} to {end_date_str}"
+        # A page visited several times, or under several URL variants, counts once
+        pages = {}
+        for item in matching_items:
+            pages.setdefault(item['canonical_url'], item)
+        search_queries = [item['search_term'] for item in pages.values()
+                          if item['search_term'] and 'google' in item['domain'].split('.')]
         
         if not matching_items:
             return f"No browsing history found for {date_str}"
         
         # Generate summary
         summary = f"Browsing Activity for {date_str}:\n"
-        summary += f"Total pages visited: {len(matching_items)}\n\n"
+        summary += f"Total pages visited: {len(pages)}\n\n"
         
         if search_queries:
             summary += f"Google Searches ({len(search_queries)} total):\n"
@@ -474,14 +598,7 @@ async def query_history_by_date_tool(context: Context, params: Dict[str, Any] =
         # Show most visited domains
         domains = {}
         for item in matching_items:
-            try:
-                from urllib.parse import urlparse
-                domain = urlparse(item['url']).netloc.lower()
-                if domain.startswith('www.'):
-                    domain = domain[4:]
-                domains[domain] = domains.get(domain, 0) + item.get('no_of_visits', 1)
-            except:
-                continue
+            domains[item['domain']] = domains.get(item['domain'], 0) + item['visit_count']
         
         if domains:
             summary += "Most Visited Sites:\n"
@@ -497,7 +614,149 @@ async def query_history_by_date_tool(context: Context, params: Dict[str, Any] =
         return f"Error querying history: {str(e)}"
 
 
-def generate_browsing_analytics_tool(output_file: str = "data/browsing_analytics.json") -> str:
+def search_history(query: str, domain: str = None, start_date: str = None, end_date: str = None,
+                   limit: int = 10):
+    """Pages matching ``query`` in their URL, title or extracted content, best first.
+
+    Served from the history store's full-text index. Quoted phrases match
+    as phrases; ``domain`` includes its subdomains; ``start_date`` and
+    ``end_date`` (end date inclusive) keep pages visited in that window.
+    """
+    results = get_history_store().search(query, domain, window_bound(start_date),
+                                         window_bound(end_date, end=True), limit)
+    for result in results:
+        result['last_visit_time'] = datetime.fromtimestamp(
+            result['last_visit_time'] / 1000, timezone.utc).isoformat().replace('+00:00', 'Z')
+    return results
+
+
+async def search_history_tool(context: Context, params: Dict[str, Any] = None) -> str:
+    """Search browsing history by what pages said, not when they were visited.
+    
+    Params:
+        query (str): Required - Words to find; "quoted phrases" match exactly
+        domain (str): Optional - Only pages on this site (and its subdomains)
+        start_date (str): Optional - First date (YYYY-MM-DD) the page was visited
+        end_date (str): Optional - Last date (YYYY-MM-DD) the page was visited
+        limit (int): Optional - Most results to return (default 10)
+    """
+    if not params or not params.get("query"):
+        return "Error: query parameter is required"
+    
+    try:
+        results = await asyncio.to_thread(
+            search_history, params["query"], params.get("domain"), params.get("start_date"),
+            params.get("end_date"), int(params.get("limit") or 10))
+    except ValueError as e:
+        return f"Error: Invalid search. {str(e)}"
+    except Exception as e:
+        return f"Error searching history: {str(e)}"
+    
+    if not results:
+        return f"No pages in your browsing history match \"{params['query']}\""
+    
+    summary = f"Pages matching \"{params['query']}\" ({len(results)} shown, best match first):\n\n"
+    for i, result in enumerate(results, 1):
+        if result['title']:
+            summary += f"{i}. {result['title']}\n   {result['url']}\n"
+        else:
+            summary += f"{i}. {result['url']}\n"
+        summary += f"   Last visited {result['last_visit_time'][:10]}, {result['visit_count']} visits\n"
+        if result['snippet']:
+            summary += f"   {result['snippet']}\n"
+        summary += "\n"
+    return summary
+
+
+def browsing_analytics(top_domains: int = 15, start_date: str = None, end_date: str = None):
+    """Current analytics snapshot, read from the history store's running totals.
+    
+    Costs O(top_domains + categories) however long the history is. With a
+    ``start_date`` and/or ``end_date`` (ISO dates or datetimes, end date
+    inclusive) the window's visits are aggregated column-wise instead.
+    Returns None when no history has been recorded (in the window).
+    """
+    store = get_history_store()
+    if start_date or end_date:
+        domains, categories = get_history_frame().window_totals(start_date, end_date, top_domains)
+    else:
+        domains, categories = store.top_domains(top_domains), store.category_totals()
+    total_visits = sum(visits for _, visits in categories)
+    if not total_visits:
+        return None
+    
+    # Optimized for pie charts and frequency analysis
+    return {
+        'domain_frequency': [
+            {
+                'domain': domain['domain'],
+                'visits': domain['visits'],
+                'category': domain['category'],
+                'percentage': round((domain['visits'] / total_visits) * 100, 1)
+            }
+            for domain in domains  # Top 15 for pie chart
+        ],
+        'category_breakdown': [
+            {
+                'category': category,
+                'visits': visits,
+                'percentage': round((visits / total_visits) * 100, 1)
+            }
+            for category, visits in categories
+        ]
+    }
+
+
+def bucket_label(granularity: str, bucket: int) -> str:
+    """A rollup bucket's UTC hour, date or ISO week (e.g. 2025-W21)"""
+    start = datetime.fromtimestamp(bucket / 1000, timezone.utc)
+    if granularity == 'hour':
+        return start.strftime('%Y-%m-%dT%H:00Z')
+    if granularity == 'day':
+        return start.date().isoformat()
+    year, week, _ = start.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def browsing_activity(granularity: str = 'day', start_date: str = None, end_date: str = None,
+                      by: str = 'category'):
+    """Visits over time from the history store's rollups, for activity charts.
+
+    ``granularity`` is 'hour', 'day' or 'week' for a time series, or
+    'hour_of_day' for the 24 UTC hours summed across the range. ``by``
+    ('category', 'domain' or None) splits each point and adds the range's
+    totals. The cost follows the number of buckets, not of visits.
+    """
+    store = get_history_store()
+    start, end = window_bound(start_date), window_bound(end_date, end=True)
+    if granularity == 'hour_of_day':
+        hours = {}
+        for bucket, *key, visits in store.rollup_series('hour', start, end, by):
+            hour_key = (bucket // HOUR_MS % 24, *key)
+            hours[hour_key] = hours.get(hour_key, 0) + visits
+        points = [(hour, *key, visits) for (hour, *key), visits in sorted(hours.items())]
+    else:
+        points = [(bucket_label(granularity, bucket), *key, visits)
+                  for bucket, *key, visits in store.rollup_series(granularity, start, end, by)]
+
+    point_key = 'hour' if granularity == 'hour_of_day' else 'bucket'
+    activity = {
+        'granularity': granularity,
+        'start_date': start_date,
+        'end_date': end_date,
+        'total_visits': sum(point[-1] for point in points),
+        'series': [
+            {point_key: point[0], **({by: point[1]} if by else {}), 'visits': point[-1]}
+            for point in points
+        ]
+    }
+    if by:
+        activity['totals'] = [{by: key, 'visits': visits} for key, visits in store.rollup_totals(start, end, by)]
+    return activity
+
+
+def generate_browsing_analytics_tool(output_file: str = "data/browsing_analytics.json",
+                                     start_date: str = None, end_date: str = None) -> str:
     """
     Analyze browsing patterns to show what you search for most and website visit frequencies.
     
@@ -509,134 +768,18 @@ def generate_browsing_analytics_tool(output_file: str = "data/browsing_analytics
     
     Args:
         output_file: Path to save the analytics JSON file
+        start_date: Optional first date (YYYY-MM-DD or ISO datetime) to analyze
+        end_date: Optional last date (inclusive) or ISO datetime (exclusive) to analyze
         
     Returns:
         Summary of most visited sites, search patterns, and category breakdown
     """
     try:
-        # Load browsing history data
-        data_file = "data/contents.json"
-        if not os.path.exists(data_file):
-            return json.dumps({"error": f"Browsing history data file not found at {data_file}"}, indent=2)
-        
-        with open(data_file, 'r', encoding='utf-8') as f:
-            browsing_data = json.load(f)
-        
-        # Initialize analytics structures
-        domain_stats = defaultdict(lambda: {
-            'total_visits': 0,
-            'unique_pages': 0,
-            'urls': [],
-            'titles': [],
-            'first_visit': None,
-            'last_visit': None
-        })
-        
-        url_frequency = Counter()
-        search_queries = Counter()
-        category_stats = defaultdict(int)
-        
-        # Process each browsing entry
-        for entry in browsing_data:
-            url = entry.get('url', '')
-            visits = entry.get('no_of_visits', 1)
-            timestamp = entry.get('timestamp', '')
-            content = entry.get('content', '')
-            
-            # Count URL frequency
-            url_frequency[url] += visits
-            
-            # Extract domain
-            try:
-                parsed_url = urlparse(url)
-                domain = parsed_url.netloc.lower()
-                if domain.startswith('www.'):
-                    domain = domain[4:]
-            except:
-                domain = 'unknown'
-            
-            # Extract page title from content or URL
-            title = extract_title_from_content(content, url)
-            
-            # Extract search queries from Google searches
-            if 'google.com/search' in url and 'q=' in url:
-                try:
-                    from urllib.parse import parse_qs, urlparse
-                    parsed = urlparse(url)
-                    params = parse_qs(parsed.query)
-                    if 'q' in params:
-                        query = params['q'][0]
-                        search_queries[query] += visits
-                except:
-                    pass
-            
-            # Update domain statistics
-            domain_stats[domain]['total_visits'] += visits
-            domain_stats[domain]['unique_pages'] += 1
-            domain_stats[domain]['urls'].append({'url': url, 'visits': visits, 'title': title})
-            if title:
-                domain_stats[domain]['titles'].append(title)
-            
-            # Update visit timestamps
-            if timestamp:
-                if not domain_stats[domain]['first_visit'] or timestamp < domain_stats[domain]['first_visit']:
-                    domain_stats[domain]['first_visit'] = timestamp
-                if not domain_stats[domain]['last_visit'] or timestamp > domain_stats[domain]['last_visit']:
-                    domain_stats[domain]['last_visit'] = timestamp
-            
-            # Categorize and count
-            domain_category = categorize_domain(domain, url, content)
-            category_stats[domain_category] += visits
-        
-        # Convert domain stats to list format
-        domain_list = []
-        for domain, stats in domain_stats.items():
-            # Get top URLs for this domain
-            top_urls = sorted(stats['urls'], key=lambda x: x['visits'], reverse=True)[:10]
-            
-            domain_list.append({
-                'domain': domain,
-                'total_visits': stats['total_visits'],
-                'unique_pages': stats['unique_pages'],
-                'category': categorize_domain(domain, '', ''),
-                'top_urls': top_urls
-            })
-        
-        # Sort domains by total visits
-        domain_list.sort(key=lambda x: x['total_visits'], reverse=True)
-        
-        # Get top URLs overall
-        top_urls_overall = [
-            {'url': url, 'visits': count} 
-            for url, count in url_frequency.most_common(20)
-        ]
-        
-        # Get top search queries
-        top_searches = [
-            {'query': query, 'searches': count} 
-            for query, count in search_queries.most_common(10)
-        ]
-        
-        # Create analytics output optimized for pie charts and frequency analysis
-        analytics = {
-            'domain_frequency': [
-                {
-                    'domain': domain['domain'],
-                    'visits': domain['total_visits'],
-                    'category': domain['category'],
-                    'percentage': round((domain['total_visits'] / sum(d['total_visits'] for d in domain_list)) * 100, 1)
-                }
-                for domain in domain_list[:15]  # Top 15 for pie chart
-            ],
-            'category_breakdown': [
-                {
-                    'category': category,
-                    'visits': visits,
-                    'percentage': round((visits / sum(category_stats.values())) * 100, 1)
-                }
-                for category, visits in sorted(category_stats.items(), key=lambda x: x[1], reverse=True)
-            ]
-        }
+        analytics = browsing_analytics(start_date=start_date, end_date=end_date)
+        if analytics is None:
+            if start_date or end_date:
+                return json.dumps({"error": "No browsing history found in the requested window"}, indent=2)
+            return json.dumps({"error": "No browsing history has been recorded yet"}, indent=2)
         
         # Save analytics to file
         if output_file and os.path.dirname(output_file):
@@ -650,117 +793,3 @@ def generate_browsing_analytics_tool(output_file: str = "data/browsing_analytics
         
     except Exception as e:
         return json.dumps({"error": f"Error generating browsing analytics: {str(e)}"}, indent=2)
-
-def extract_title_from_content(content: str, url: str) -> str:
-    """Extract meaningful title from page content or URL."""
-    if not content:
-        return extract_title_from_url(url)
-    
-    # Try to extract title from common patterns in content
-    content_lower = content.lower()
-    
-    # Look for common title patterns
-    title_patterns = [
-        r'(.*?)\s*[-|–]\s*.*',  # Title - Site pattern
-        r'(.*?)\s*\|\s*.*',     # Title | Site pattern
-        r'^([^•\n]{10,100})',   # First substantial line
-    ]
-    
-    lines = [line.strip() for line in content.split('\n') if line.strip()]
-    if lines:
-        first_line = lines[0]
-        
-        # Try patterns
-        for pattern in title_patterns:
-            match = re.match(pattern, first_line)
-            if match:
-                title = match.group(1).strip()
-                if len(title) > 5 and not title.lower().startswith(('skip', 'navigation', 'menu')):
-                    return title
-        
-        # If no pattern matches, use first line if it's reasonable
-        if 5 <= len(first_line) <= 100 and not first_line.lower().startswith(('skip', 'navigation', 'menu')):
-            return first_line
-    
-    # Fallback to URL-based title
-    return extract_title_from_url(url)
-
-def extract_title_from_url(url: str) -> str:
-    """Extract a title from URL structure."""
-    try:
-        parsed = urlparse(url)
-        
-        # Handle search queries
-        if 'search' in parsed.path or 'q=' in parsed.query:
-            if 'q=' in parsed.query:
-                from urllib.parse import parse_qs
-                params = parse_qs(parsed.query)
-                if 'q' in params:
-                    return f"Search: {params['q'][0]}"
-        
-        # Use path segments
-        path_parts = [part for part in parsed.path.split('/') if part and part != 'index.html']
-        if path_parts:
-            # Clean up the last path segment
-            title = path_parts[-1].replace('-', ' ').replace('_', ' ')
-            # Capitalize words
-            title = ' '.join(word.capitalize() for word in title.split())
-            return title
-        
-        # Use domain as fallback
-        domain = parsed.netloc
-        if domain.startswith('www.'):
-            domain = domain[4:]
-        return domain.split('.')[0].capitalize()
-    
-    except:
-        return 'Unknown Page'
-
-def categorize_domain(domain: str, url: str, content: str) -> str:
-    """Categorize a domain based on its name, URL patterns, and content."""
-    domain_lower = domain.lower()
-    url_lower = url.lower()
-    content_lower = content.lower()
-    
-    # Social Media
-    social_domains = ['facebook', 'twitter', 'instagram', 'linkedin', 'youtube', 'tiktok', 'reddit', 'discord']
-    if any(social in domain_lower for social in social_domains):
-        return 'Social Media'
-    
-    # Search Engines
-    search_domains = ['google', 'bing', 'yahoo', 'duckduckgo']
-    if any(search in domain_lower for search in search_domains) and ('search' in url_lower or 'q=' in url_lower):
-        return 'Search'
-    
-    # News & Media
-    news_domains = ['news', 'cnn', 'bbc', 'reuters', 'ap', 'nbc', 'abc', 'cbs', 'fox', 'npr', 'bloomberg', 'techcrunch', 'wired']
-    if any(news in domain_lower for news in news_domains):
-        return 'News & Media'
-    
-    # Tech & Development
-    tech_domains = ['github', 'stackoverflow', 'developer', 'docs', 'api', 'chrome', 'microsoft', 'apple']
-    if any(tech in domain_lower for tech in tech_domains):
-        return 'Technology'
-    
-    # E-commerce
-    commerce_domains = ['amazon', 'ebay', 'shop', 'store', 'buy', 'cart']
-    if any(commerce in domain_lower for commerce in commerce_domains):
-        return 'E-commerce'
-    
-    # Education
-    edu_domains = ['edu', 'university', 'college', 'learn', 'course', 'tutorial']
-    if any(edu in domain_lower for edu in edu_domains):
-        return 'Education'
-    
-    # Entertainment
-    entertainment_domains = ['netflix', 'hulu', 'disney', 'spotify', 'music', 'game', 'entertainment']
-    if any(ent in domain_lower for ent in entertainment_domains):
-        return 'Entertainment'
-    
-    # Business Tools
-    business_domains = ['calendar', 'email', 'office', 'workspace', 'drive', 'cloud', 'teams']
-    if any(biz in domain_lower for biz in business_domains):
-        return 'Business Tools'
-    
-    # Default category
-    return 'Other' 
@@ -1,21 +1,41 @@
 import asyncio
 import json
 import logging
+from urllib.parse import parse_qs, urlsplit
 import websockets
 from websockets.server import WebSocketServerProtocol
 from context import Context
 
 logger = logging.getLogger(__name__)
 
+# Largest message accepted from an extension; full-page screenshots run to several MB
+MAX_MESSAGE_SIZE = 64 * 2 ** 20
+
+
+def client_identity(websocket: WebSocketServerProtocol):
+    """client_id, group and capabilities from the connection URL,
+    e.g. ws://127.0.0.1:8765/?client_id=work&group=chrome&capabilities=batch"""
+    request = getattr(websocket, "request", None)
+    path = request.path if request is not None else getattr(websocket, "path", "")
+    params = parse_qs(urlsplit(path).query)
+    capabilities = {name.strip() for value in params.get("capabilities", [])
+                    for name in value.split(",") if name.strip()}
+    return params.get("client_id", [None])[0], params.get("group", [None])[0], capabilities
+
 
 async def handle_websocket_connection(websocket: WebSocketServerProtocol, context: Context):
     """Handle incoming WebSocket connection from browser extension."""
-    logger.info("Browser extension connected")
-    context.set_ws(websocket)
+    connection = context.register(websocket, *client_identity(websocket))
+    logger.info(f"Browser extension connected as {connection.client_id}")
     
     try:
         async for message in websocket:
             try:
+                if isinstance(message, bytes):
+                    # Binary frames carry raw screenshot bytes after a JSON header
+                    context.handle_binary_response(message, connection)
+                    continue
+
                 data = json.loads(message)
 
                 # Handle debug log messages separately
@@ -24,19 +44,18 @@ async def handle_websocket_connection(websocket: WebSocketServerProtocol, contex
                     logger.info("[DEBUG_LOG] %s", payload.get("message"))
                     continue  # Skip normal handling
 
-                context.handle_response(data)
+                context.handle_response(data, connection)
             except json.JSONDecodeError:
                 logger.error(f"Invalid JSON received: {message}")
             except Exception as e:
                 logger.error(f"Error handling message: {e}")
                 
     except websockets.exceptions.ConnectionClosed:
-        logger.info("Browser extension disconnected")
+        logger.info(f"Browser extension {connection.client_id} disconnected")
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
     finally:
-        if context.has_ws() and context._ws == websocket:
-            context._ws = None
+        context.unregister(connection)
 
 
 async def start_websocket_server(context: Context, host: str = "127.0.0.1", port: int = 8765):
@@ -46,7 +65,8 @@ async def start_websocket_server(context: Context, host: str = "127.0.0.1", port
     server = await websockets.serve(
         lambda ws: handle_websocket_connection(ws, context),
         host,
-        port
+        port,
+        max_size=MAX_MESSAGE_SIZE
     )
     
     logger.info(f"WebSocket server listening on ws://{host}:{port}")
@@ -1,6 +1,8 @@
+import json
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from history_processor import HistoryProcessor
+from history_processor import HistoryProcessor, ingest_jobs
 from typing import List, Optional
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -15,7 +17,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize processor
+# Initialize processor; ingest runs in the background on the queue shared with
+# the Flask app, and POSTs return a job to poll
 processor = HistoryProcessor()
 
 class Query(BaseModel):
@@ -28,23 +31,39 @@ class QueryResponse(BaseModel):
     answer: str
     sources: Optional[List[str]] = None
 
-@app.post("/process-history")
+@app.post("/process-history", status_code=202)
 async def process_history():
-    """Process all URLs from browser history"""
+    """Queue all URLs from browser history for processing"""
     try:
-        processor.process_history()
-        return {"status": "success", "message": "History processed successfully"}
+        return processor.process_history().to_dict()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/process-urls")
+@app.post("/process-urls", status_code=202)
 async def process_urls(request: ProcessURLsRequest):
-    """Process specific URLs"""
-    try:
-        processor.processor.process_urls(request.urls)
-        return {"status": "success", "message": f"Processed {len(request.urls)} URLs"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    """Queue specific URLs for processing"""
+    return ingest_jobs.submit(request.urls).to_dict()
+
+@app.get("/jobs")
+async def list_jobs():
+    """Status of recent ingest jobs, oldest first"""
+    return [job.to_dict() for job in ingest_jobs.jobs()]
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    """Progress of an ingest job: page counts and throughput"""
+    job = ingest_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job.to_dict()
+
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """Cancel a queued or running ingest job"""
+    job = ingest_jobs.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job.to_dict()
 
 @app.post("/query", response_model=QueryResponse)
 async def query_history(query: Query):
@@ -58,6 +77,27 @@ async def query_history(query: Query):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/query/stream")
+async def stream_query_history(query: Query):
+    """Query processed history, streaming the answer as server-sent events
+
+    Emits "token" events as the answer is generated, then one "sources" event
+    and a final "done" event (or an "error" event if the query fails).
+    """
+    async def events():
+        try:
+            async for event, data in processor.processor.astream_query(query.question):
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps(str(e))}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
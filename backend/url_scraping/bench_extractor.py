@@ -0,0 +1,67 @@
+"""Throughput benchmark: extractor.extract_text vs the original BeautifulSoup path.
+
+Usage: python bench_extractor.py [pages] [paragraphs_per_page]
+"""
+import random
+import sys
+import time
+from bs4 import BeautifulSoup
+import extractor
+
+
+def legacy_html_to_text(html: str) -> str:
+    """The pre-extractor implementation from BrowseIQProcessor.extract_content"""
+    soup = BeautifulSoup(html, 'html.parser')
+    for script in soup(["script", "style"]):
+        script.decompose()
+    text = soup.get_text(separator='\n', strip=True)
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    return '\n'.join(lines)
+
+
+def make_page(rng: random.Random, paragraphs: int) -> str:
+    words = ['browser', 'history', 'python', 'async', 'github', 'error', 'index', 'query',
+             'vector', 'search', 'domain', 'render', 'cookie', 'layout', 'stream', 'parser']
+    def sentence():
+        return ' '.join(rng.choice(words) for _ in range(rng.randint(8, 20))) + '.'
+    body = ''.join(
+        f'<div class="post"><h2>{sentence()}</h2><p>{sentence()} <a href="/p/{i}">{sentence()}</a> {sentence()}</p></div>'
+        for i in range(paragraphs)
+    )
+    return (
+        '<!DOCTYPE html><html><head><title>Benchmark page</title>'
+        '<style>body { font-family: sans-serif; }</style>'
+        f'<script>window.data = {list(range(200))};</script></head><body>'
+        '<nav><ul>' + ''.join(f'<li><a href="/{w}">{w}</a></li>' for w in words) + '</ul></nav>'
+        f'<main>{body}</main>'
+        '<div id="cookie-banner">We use cookies. <button>Accept</button></div>'
+        '<footer>Copyright. All rights reserved.</footer></body></html>'
+    )
+
+
+def bench(name, fn, pages):
+    total_bytes = sum(len(page) for page in pages)
+    start = time.perf_counter()
+    for page in pages:
+        fn(page)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<28} {len(pages) / elapsed:9.1f} pages/s  {total_bytes / elapsed / 1e6:7.2f} MB/s")
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    paragraphs = int(sys.argv[2]) if len(sys.argv) > 2 else 150
+    rng = random.Random(42)
+    pages = [make_page(rng, paragraphs) for _ in range(count)]
+    print(f"{count} pages, {sum(len(p) for p in pages) / count / 1024:.0f} KiB average")
+    print(f"extractor backend: {'selectolax (lexbor)' if extractor.LexborHTMLParser else 'BeautifulSoup/' + extractor.BS4_FEATURES}")
+
+    legacy = bench("legacy html.parser", legacy_html_to_text, pages)
+    fast = bench("extract_text", extractor.extract_text, pages)
+    bench("extract_text (keep chrome)", lambda page: extractor.extract_text(page, strip_boilerplate=False), pages)
+    print(f"speedup: {legacy / fast:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
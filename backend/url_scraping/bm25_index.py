@@ -0,0 +1,102 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+from langchain.schema import Document
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict
+
+QUERY_TOKEN_PATTERN = re.compile(r'\w+')
+
+
+class BM25Index:
+    """Local inverted index over content chunks, scored with BM25.
+
+    Backed by an SQLite FTS5 table, so pages can be added or replaced one at
+    a time and lookups need no embedding calls.
+    """
+
+    def __init__(self, content_dir: str = "url_contents"):
+        os.makedirs(content_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(content_dir, "keyword_index.db"), check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                page_hash TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS chunks (
+                rowid INTEGER PRIMARY KEY,
+                chunk_id TEXT NOT NULL,
+                url TEXT NOT NULL,
+                metadata TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_chunks_url ON chunks(url);
+            CREATE VIRTUAL TABLE IF NOT EXISTS chunk_text USING fts5(text, tokenize='unicode61');
+        """)
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def page_hash(self, url: str):
+        """Content hash the URL was last indexed with, or None"""
+        with self._lock:
+            row = self._conn.execute("SELECT page_hash FROM pages WHERE url = ?", (url,)).fetchone()
+        return row[0] if row else None
+
+    def replace_page(self, url: str, page_hash: str, chunks):
+        """Replace a page's indexed chunks with ``chunks``, a list of (chunk_id, Document)"""
+        with self._lock, self._conn:
+            self._delete(url)
+            self._conn.execute("INSERT INTO pages (url, page_hash) VALUES (?, ?)", (url, page_hash))
+            for chunk_id, chunk in chunks:
+                cursor = self._conn.execute(
+                    "INSERT INTO chunks (chunk_id, url, metadata) VALUES (?, ?, ?)",
+                    (chunk_id, url, json.dumps(chunk.metadata))
+                )
+                self._conn.execute(
+                    "INSERT INTO chunk_text (rowid, text) VALUES (?, ?)",
+                    (cursor.lastrowid, chunk.page_content)
+                )
+
+    def _delete(self, url: str):
+        self._conn.execute("DELETE FROM chunk_text WHERE rowid IN (SELECT rowid FROM chunks WHERE url = ?)", (url,))
+        self._conn.execute("DELETE FROM chunks WHERE url = ?", (url,))
+        self._conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+
+    def search(self, query: str, k: int = 4):
+        """Return up to k (Document, score) pairs ranked by BM25, best first"""
+        terms = QUERY_TOKEN_PATTERN.findall(query)
+        if not terms:
+            return []
+        # Quote each term so user input is never parsed as FTS syntax
+        match = " OR ".join('"{}"'.format(term.replace('"', '""')) for term in dict.fromkeys(terms))
+        with self._lock:
+            rows = self._conn.execute(
+                """SELECT chunk_text.text, chunks.chunk_id, chunks.metadata, bm25(chunk_text) AS score
+                   FROM chunk_text JOIN chunks ON chunks.rowid = chunk_text.rowid
+                   WHERE chunk_text MATCH ?
+                   ORDER BY score LIMIT ?""",
+                (match, k)
+            ).fetchall()
+        # SQLite's bm25() is negative, lower meaning more relevant
+        return [
+            (Document(page_content=text, metadata={**json.loads(metadata), 'chunk_id': chunk_id}), -score)
+            for text, chunk_id, metadata, score in rows
+        ]
+
+
+class BM25Retriever(BaseRetriever):
+    """LangChain retriever over a BM25Index"""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    index: BM25Index
+    k: int = 4
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun):
+        return [doc for doc, _ in self.index.search(query, self.k)]
@@ -0,0 +1,214 @@
+import asyncio
+import logging
+from urllib.parse import urlparse
+import httpx
+from extractor import is_html_content_type
+from politeness import HostScheduler, backoff_delay, parse_crawl_delay, retry_after_seconds
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5'
+}
+
+# Answers worth retrying: the host is overloaded or briefly unavailable
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRY_AFTER = 30.0
+
+
+class AsyncCrawler:
+    """Concurrent HTTP fetcher with a global cap, per-host caps and one shared connection pool.
+
+    Use as an async context manager so the keep-alive pool is opened once per crawl:
+
+        async with AsyncCrawler(concurrency=32) as crawler:
+            pages = await asyncio.gather(*(crawler.fetch(u) for u in urls))
+
+    Requests to each host are paced so it sees at most ``per_host_concurrency``
+    requests per ``per_host_delay`` seconds, or one per robots.txt
+    Crawl-delay if that is slower and a ``robots_cache`` is given. Pacing and
+    circuit breakers live in ``scheduler``; pass one shared HostScheduler to
+    carry them from one crawl to the next.
+    """
+
+    def __init__(self, concurrency=32, per_host_concurrency=4, timeout=15.0,
+                 per_host_delay=0.0, headers=None, max_bytes=2 * 1024 * 1024, html_only=True,
+                 decode_text=True, retries=2, scheduler=None, robots_cache=None):
+        self.concurrency = concurrency
+        self.per_host_concurrency = per_host_concurrency
+        self.timeout = timeout
+        self.per_host_delay = per_host_delay
+        self.headers = headers or DEFAULT_HEADERS
+        self.max_bytes = max_bytes
+        self.html_only = html_only
+        # Callers that parse elsewhere can skip decoding and use content/encoding
+        self.decode_text = decode_text
+        self.retries = retries
+        self.scheduler = scheduler or HostScheduler()
+        self.robots_cache = robots_cache
+        self._client = None
+        self._global_slots = None
+        self._host_slots = {}
+        self._crawl_delays = {}
+
+    async def __aenter__(self):
+        self._client = httpx.AsyncClient(
+            headers=self.headers,
+            timeout=httpx.Timeout(self.timeout, connect=min(self.timeout, 5.0)),
+            limits=httpx.Limits(
+                max_connections=self.concurrency,
+                max_keepalive_connections=self.concurrency
+            ),
+            follow_redirects=True,
+            verify=True
+        )
+        self._global_slots = asyncio.Semaphore(self.concurrency)
+        self._host_slots = {}
+        self._crawl_delays = {}
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._client.aclose()
+        self._client = None
+
+    async def _read_capped(self, response: httpx.Response):
+        """Read a streamed body up to max_bytes, returning (body, truncated)"""
+        declared = response.headers.get('content-length')
+        if declared and declared.isdigit() and int(declared) > self.max_bytes:
+            logger.warning("Truncating %s: declared size %s exceeds %s bytes", response.url, declared, self.max_bytes)
+        chunks, size = [], 0
+        async for chunk in response.aiter_bytes():
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= self.max_bytes:
+                return b''.join(chunks)[:self.max_bytes], True
+        return b''.join(chunks), False
+
+    def _host_slot(self, url: str) -> asyncio.Semaphore:
+        """Return the semaphore that caps in-flight requests for the URL's host"""
+        host = host_key(url)
+        if host not in self._host_slots:
+            self._host_slots[host] = asyncio.Semaphore(self.per_host_concurrency)
+        return self._host_slots[host]
+
+    async def _crawl_delay(self, url: str) -> float:
+        """robots.txt Crawl-delay for the URL's host (0 when not using robots.txt)"""
+        if self.robots_cache is None:
+            return 0.0
+        host = host_key(url)
+        if host not in self._crawl_delays:
+            self._crawl_delays[host] = asyncio.ensure_future(self._load_crawl_delay(url, host))
+        # Shielded: one fetcher being cancelled must not cancel the lookup for the others
+        return await asyncio.shield(self._crawl_delays[host]) or 0.0
+
+    async def _load_crawl_delay(self, url: str, host: str):
+        found, delay = self.robots_cache.get(host)
+        if found:
+            return delay
+        parts = urlparse(url)
+        try:
+            response = await self._client.get(f"{parts.scheme}://{parts.netloc}/robots.txt",
+                                              timeout=min(self.timeout, 5.0))
+        except httpx.HTTPError:
+            return None  # Not cached: the host may just be down right now
+        if response.status_code == 200:
+            delay = parse_crawl_delay(response.text, self.headers.get('User-Agent', '*'))
+        self.robots_cache.put(host, delay)
+        return delay
+
+    async def _request(self, url: str, headers: dict, result: dict):
+        """Make one request into ``result``, returning (retryable, Retry-After seconds)"""
+        try:
+            async with self._client.stream('GET', url, headers=headers) as response:
+                result['final_url'] = str(response.url)
+                result['status'] = response.status_code
+                result['headers'] = dict(response.headers)
+                if response.status_code != 304:
+                    response.raise_for_status()
+                    content_type = response.headers.get('content-type', '')
+                    if self.html_only and not is_html_content_type(content_type):
+                        raise ValueError(f"Unsupported content type: {content_type}")
+                    result['content'], result['truncated'] = await self._read_capped(response)
+                    result['encoding'] = response.encoding
+                    if self.decode_text:
+                        result['text'] = result['content'].decode(response.encoding or 'utf-8', errors='replace')
+        except httpx.HTTPStatusError as e:
+            result['error'] = str(e)
+            if e.response.status_code in RETRY_STATUSES:
+                return True, retry_after_seconds(e.response.headers.get('retry-after'))
+        except httpx.TransportError as e:
+            # Timeouts, refused connections, resets: the host itself is struggling
+            result['error'] = str(e) or e.__class__.__name__
+            return True, None
+        except Exception as e:
+            result['error'] = str(e) or e.__class__.__name__
+        return False, None
+
+    async def fetch(self, url: str, headers: dict = None) -> dict:
+        """Fetch a URL, returning a result dict instead of raising on failure
+
+        A 304 answer to conditional ``headers`` is reported with its status
+        and no error, so callers can reuse their cached copy. The body is
+        streamed: non-HTML responses (when ``html_only``) are rejected from
+        their headers alone, and reading stops after ``max_bytes``.
+
+        Timeouts, connection errors, 429 and 5xx answers are retried up to
+        ``retries`` times with exponential backoff and jitter (or Retry-After)
+        and count towards the host's circuit breaker. While it is open the
+        host's remaining URLs fail immediately instead of each timing out.
+        """
+        host = host_key(url)
+        crawl_delay = await self._crawl_delay(url)
+        if crawl_delay > self.per_host_delay / self.per_host_concurrency:
+            interval, burst = crawl_delay, 1
+        else:
+            interval, burst = self.per_host_delay / self.per_host_concurrency, self.per_host_concurrency
+
+        attempt = 0
+        while True:
+            result = {'url': url, 'final_url': url, 'status': None, 'headers': {},
+                      'content': b'', 'text': '', 'encoding': None, 'truncated': False, 'error': None}
+            async with self._host_slot(url):
+                wait = self.scheduler.reserve(host, interval, burst)
+                if wait:
+                    await asyncio.sleep(wait)
+                # Checked after queueing for the host, so waiters bail out as soon as it trips
+                if not self.scheduler.allow(host):
+                    result['error'] = f"Skipped: {host} is failing repeatedly"
+                    return result
+                async with self._global_slots:
+                    retryable, retry_after = await self._request(url, headers, result)
+            if not retryable:
+                self.scheduler.record_success(host)
+                return result
+            self.scheduler.record_failure(host)
+            if attempt >= self.retries:
+                return result
+            await asyncio.sleep(min(retry_after, MAX_RETRY_AFTER) if retry_after is not None
+                                else backoff_delay(attempt))
+            attempt += 1
+
+
+def host_key(url: str) -> str:
+    """Host a URL is paced, capped and circuit-broken under"""
+    return urlparse(url).netloc.lower()
+
+
+def page_text(page: dict) -> str:
+    """Text of a fetch result, decoding the body if the crawler did not"""
+    return page['text'] or page['content'].decode(page['encoding'] or 'utf-8', errors='replace')
+
+
+def interleave_hosts(urls):
+    """Order URLs round-robin across hosts, so a run of URLs on one busy
+    host does not hold up a fixed pool of fetchers"""
+    by_host = {}
+    for url in urls:
+        by_host.setdefault(host_key(url), []).append(url)
+    queues = list(by_host.values())
+    ordered = []
+    for i in range(max((len(q) for q in queues), default=0)):
+        ordered.extend(q[i] for q in queues if i < len(q))
+    return ordered
@@ -0,0 +1,85 @@
+import math
+import os
+import re
+import zlib
+from langchain.embeddings import CacheBackedEmbeddings
+from langchain.storage import LocalFileStore
+from langchain_community.embeddings import OpenAIEmbeddings
+from langchain_core.embeddings import Embeddings
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+
+class HashingEmbeddings(Embeddings):
+    """Deterministic local embeddings built from hashed word and character n-grams.
+
+    Needs no external service, so the ingest and RAG pipeline can be run and
+    benchmarked offline. Vectors are L2-normalised for cosine similarity.
+    """
+
+    def __init__(self, size: int = 384, ngram_range=(3, 5)):
+        self.size = size
+        self.ngram_range = ngram_range
+
+    @property
+    def model(self) -> str:
+        return f"hashing-{self.size}-{self.ngram_range[0]}-{self.ngram_range[1]}"
+
+    def _features(self, text: str):
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        for token in tokens:
+            yield token
+            padded = f"<{token}>"
+            for n in range(self.ngram_range[0], self.ngram_range[1] + 1):
+                for i in range(len(padded) - n + 1):
+                    yield padded[i:i + n]
+        for first, second in zip(tokens, tokens[1:]):
+            yield f"{first} {second}"
+
+    def _embed(self, text: str):
+        vector = [0.0] * self.size
+        for feature in self._features(text):
+            h = zlib.crc32(feature.encode())
+            # The top bit picks the sign so collisions tend to cancel out
+            vector[h % self.size] += 1.0 if h & 0x80000000 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector))
+        return [v / norm for v in vector] if norm else vector
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str):
+        return self._embed(text)
+
+
+class ChunkCacheEmbeddings(CacheBackedEmbeddings):
+    """Cache-backed embeddings that also collapse repeated chunks within one call"""
+
+    def embed_documents(self, texts):
+        unique = list(dict.fromkeys(texts))
+        vectors = dict(zip(unique, super().embed_documents(unique)))
+        return [vectors[text] for text in texts]
+
+
+def create_embeddings(backend: str = None, cache_dir: str = "embedding_cache", batch_size: int = 512):
+    """Build the embedding layer used for indexing and retrieval.
+
+    ``backend`` is "openai" or "local" (defaults to $BROWSEIQ_EMBEDDINGS, then
+    "openai"). Vectors are cached on disk keyed by model name and chunk text
+    hash, and only cache misses are sent to the backend, ``batch_size`` at a time.
+    """
+    backend = backend or os.getenv("BROWSEIQ_EMBEDDINGS", "openai")
+    if backend == "openai":
+        underlying = OpenAIEmbeddings()
+    elif backend == "local":
+        underlying = HashingEmbeddings()
+    else:
+        raise ValueError(f"Unknown embedding backend: {backend}")
+
+    return ChunkCacheEmbeddings.from_bytes_store(
+        underlying,
+        LocalFileStore(cache_dir),
+        namespace=underlying.model,
+        batch_size=batch_size,
+        key_encoder="sha256"
+    )
@@ -0,0 +1,79 @@
+from bs4 import BeautifulSoup
+
+# selectolax's lexbor backend is a C parser that is many times faster than
+# BeautifulSoup; fall back to BeautifulSoup (lxml if available) without it
+try:
+    from selectolax.lexbor import LexborHTMLParser, SelectolaxError
+except ImportError:
+    LexborHTMLParser = SelectolaxError = None
+
+try:
+    import lxml  # noqa: F401
+    BS4_FEATURES = 'lxml'
+except ImportError:
+    BS4_FEATURES = 'html.parser'
+
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+
+# Elements that never carry page content
+NON_CONTENT_SELECTOR = 'script, style, noscript, template, svg'
+
+# Names that mark a cookie/consent banner; plain "cookie" or "consent" also
+# appear on page containers (e.g. <body class="cookies-accepted">)
+BANNER_NAMES = ('cookie-banner', 'cookie-notice', 'cookie-bar', 'cookie-popup', 'consent-banner', 'gdpr-banner')
+
+# Site chrome repeated across pages: navigation, footers and cookie/consent banners
+BOILERPLATE_SELECTOR = ', '.join([
+    'nav', 'footer', '[role="navigation"]', '[role="contentinfo"]',
+    *(f'{tag}[{attribute}*="{name}" i]' for tag in ('div', 'section', 'aside', 'dialog')
+      for attribute in ('id', 'class') for name in BANNER_NAMES),
+    '[aria-label="cookie banner" i]', '[aria-label="cookie consent" i]', '[aria-label="cookie notice" i]'
+])
+
+# Never removed as boilerplate, nor is anything containing them
+CONTENT_TAGS = ('html', 'body', 'main', 'article')
+CONTENT_SELECTOR = ', '.join(CONTENT_TAGS)
+
+
+def is_html_content_type(content_type: str) -> bool:
+    """Whether a Content-Type header denotes an HTML page (missing counts as HTML)"""
+    if not content_type:
+        return True
+    return content_type.split(';')[0].strip().lower() in HTML_CONTENT_TYPES
+
+
+def _clean_lines(text: str) -> str:
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    return '\n'.join(lines)
+
+
+def extract_text(html, strip_boilerplate: bool = True) -> str:
+    """Convert an HTML document (str or bytes) to cleaned, newline-separated text
+
+    Produces the same format as the original BeautifulSoup path: one stripped,
+    non-empty line per text block.
+    """
+    if LexborHTMLParser is not None:
+        tree = LexborHTMLParser(html)
+        for node in tree.css(NON_CONTENT_SELECTOR):
+            node.decompose()
+        if strip_boilerplate:
+            for node in tree.css(BOILERPLATE_SELECTOR):
+                if node.tag in CONTENT_TAGS or node.css_first(CONTENT_SELECTOR) is not None:
+                    continue
+                try:
+                    node.decompose()
+                except SelectolaxError:
+                    continue
+        root = tree.root
+        return _clean_lines(root.text(separator='\n', strip=True)) if root else ""
+
+    soup = BeautifulSoup(html, BS4_FEATURES)
+    for node in soup.select(NON_CONTENT_SELECTOR):
+        node.decompose()
+    if strip_boilerplate:
+        for node in soup.select(BOILERPLATE_SELECTOR):
+            if node.name in CONTENT_TAGS or node.select_one(CONTENT_SELECTOR) is not None:
+                continue
+            node.decompose()
+    return _clean_lines(soup.get_text(separator='\n', strip=True))
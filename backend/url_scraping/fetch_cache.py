@@ -0,0 +1,132 @@
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+# backend/ holds the browseiq_common package shared with the MCP server
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.append(BACKEND_DIR)
+
+from browseiq_common.urls import canonicalize_url
+
+
+def cache_key(url: str) -> str:
+    """Key a URL for the cache, so variants of the same page share one entry"""
+    return canonicalize_url(url)
+
+
+class FetchCache:
+    """Persistent fetch cache keyed by canonical URL with HTTP revalidation metadata.
+
+    Extracted text is stored content-addressed under ``content_dir`` so pages
+    with identical content share one file; the SQLite index keeps the body
+    hash, ETag/Last-Modified and fetch time needed for conditional GETs.
+    """
+
+    def __init__(self, content_dir: str = "url_contents", ttl_seconds: float = 24 * 60 * 60):
+        self.content_dir = content_dir
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(content_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(content_dir, "fetch_cache.db"), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                body_hash TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_content_hash ON pages(content_hash)")
+        self._conn.commit()
+
+    def _content_path(self, content_hash: str) -> str:
+        return os.path.join(self.content_dir, f"content_{content_hash}.txt")
+
+    def get(self, url: str):
+        """Return the cache entry for a URL as a dict, or None"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM pages WHERE url = ?", (cache_key(url),)).fetchone()
+        return dict(row) if row else None
+
+    def is_fresh(self, entry: dict) -> bool:
+        """Whether an entry is within the TTL and can be served without revalidation"""
+        return time.time() - entry['fetched_at'] < self.ttl_seconds
+
+    def conditional_headers(self, entry) -> dict:
+        """Request headers that let the server answer 304 for an unchanged page"""
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def read(self, entry: dict) -> str:
+        """Read the cached text for an entry, or "" if its file is gone"""
+        try:
+            with open(self._content_path(entry['content_hash']), 'r', encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return ""
+
+    def path(self, url: str):
+        """Path of the cached text file for a URL, or None"""
+        entry = self.get(url)
+        return self._content_path(entry['content_hash']) if entry else None
+
+    def paths(self) -> dict:
+        """Map every cached URL to its text file"""
+        with self._lock:
+            rows = self._conn.execute("SELECT url, content_hash FROM pages").fetchall()
+        return {row['url']: self._content_path(row['content_hash']) for row in rows}
+
+    def put(self, url: str, content: str, body_hash: str = None, etag: str = None, last_modified: str = None) -> dict:
+        """Store extracted content for a URL and return the new entry"""
+        content_hash = hashlib.sha256(content.encode()).hexdigest()
+        path = self._content_path(content_hash)
+        if not os.path.exists(path):
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+
+        key = cache_key(url)
+        with self._lock:
+            old = self._conn.execute("SELECT content_hash FROM pages WHERE url = ?", (key,)).fetchone()
+            self._conn.execute(
+                """INSERT INTO pages (url, content_hash, body_hash, etag, last_modified, fetched_at)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(url) DO UPDATE SET
+                       content_hash = excluded.content_hash, body_hash = excluded.body_hash,
+                       etag = excluded.etag, last_modified = excluded.last_modified,
+                       fetched_at = excluded.fetched_at""",
+                (key, content_hash, body_hash, etag, last_modified, time.time())
+            )
+            self._conn.commit()
+            orphaned = old and old['content_hash'] != content_hash and not self._conn.execute(
+                "SELECT 1 FROM pages WHERE content_hash = ? LIMIT 1", (old['content_hash'],)
+            ).fetchone()
+        if orphaned:
+            try:
+                os.remove(self._content_path(old['content_hash']))
+            except OSError:
+                pass
+        return self.get(url)
+
+    def touch(self, url: str, etag: str = None, last_modified: str = None):
+        """Mark a cached URL as revalidated, keeping its content"""
+        with self._lock:
+            self._conn.execute(
+                """UPDATE pages SET fetched_at = ?,
+                       etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified)
+                   WHERE url = ?""",
+                (time.time(), etag, last_modified, cache_key(url))
+            )
+            self._conn.commit()
@@ -1,68 +1,170 @@
+import os
+import sys
 import pandas as pd
+import codecs
 import json
-import os
 from flask import Flask, request, jsonify
 from langchain_processor import BrowseIQProcessor
 from keyword_extractor import KeywordExtractor
+from ingest_jobs import IngestQueue
 from datetime import datetime
 
+# backend/ holds the browseiq_common package shared with the MCP server
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.append(BACKEND_DIR)
+
+from browseiq_common.history_store import HistoryStore
+
 app = Flask(__name__)
 processor = BrowseIQProcessor() # This processor handles content extraction and saving to .txt
 keyword_extractor = KeywordExtractor()
+ingest_jobs = IngestQueue(processor)
+history_store = HistoryStore()
+
+# Request bodies are read in chunks of this size
+STREAM_CHUNK_SIZE = 64 * 1024
+
+def visit_timestamp(last_visit_time) -> str:
+    """ISO timestamp for an extension lastVisitTime (ms since the epoch)"""
+    return datetime.fromtimestamp(last_visit_time/1000).isoformat() + 'Z'
+
+def store_contents(urls, browseiq_processor=processor):
+    """Copy the text extracted for ingested URLs into the history store"""
+    contents = [(url, browseiq_processor.get_url_content(url)) for url in urls]
+    history_store.set_contents([(url, content) for url, content in contents if content])
 
-# Define the directory to save JSON files
-OUTPUT_DIR = 'processed_history'
+def iter_json_array(stream, chunk_size=STREAM_CHUNK_SIZE):
+    """Yield the items of a JSON array read incrementally from a binary stream
+
+    Only the current item and one chunk are held in memory, however long
+    the array is. Raises ValueError if the body is not a JSON array.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer, pos, eof = '', 0, False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        data = stream.read(chunk_size)
+        if not data:
+            eof = True
+        buffer = buffer[pos:] + text_decoder.decode(data, final=eof)
+        pos = 0
+
+    def next_char():
+        """Advance past whitespace and return the next character ('' at the end)"""
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n':
+                pos += 1
+            if pos < len(buffer) or eof:
+                return buffer[pos] if pos < len(buffer) else ''
+            fill()
+
+    if next_char() != '[':
+        raise ValueError("Expected a JSON array of history entries")
+    pos += 1
+    if next_char() == ']':
+        return
+    while True:
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise ValueError("Malformed JSON in history payload")
+            fill()  # The item continues in the next chunk
+            continue
+        if end == len(buffer) and not eof:
+            # A number at the end of the buffer may continue in the next chunk
+            fill()
+            continue
+        pos = end
+        yield item
 
-# Create the output directory if it doesn't exist
-if not os.path.exists(OUTPUT_DIR):
-    os.makedirs(OUTPUT_DIR)
+        separator = next_char()
+        if separator == ']':
+            return
+        if separator != ',':
+            raise ValueError("Malformed JSON in history payload" if separator else "Unexpected end of JSON array")
+        pos += 1
+        next_char()
 
 @app.route('/api/history', methods=['POST'])
 def receive_history():
-    history_data = request.json
-    processor = BrowseIQProcessor()
-    
-    # Process URLs and get content
-    processor.process_urls([entry['url'] for entry in history_data])
-    
-    # Group history by URL and filter out entries with no content
-    url_data = {}
-    for entry in history_data:
-        url = entry['url']
-        content = processor.get_url_content(url)
-        
-        # Skip URLs with no content
-        if not content:
-            print(f"Skipping {url} - no content available")
-            continue
-            
-        if url not in url_data:
-            url_data[url] = {
-                'url': url,
-                'timestamp': datetime.fromtimestamp(entry['lastVisitTime']/1000).isoformat() + 'Z',
-                'no_of_visits': 1,
-                'content': content
-            }
-        else:
-            url_data[url]['no_of_visits'] += 1
-            # Keep the most recent timestamp
-            current_timestamp = datetime.fromtimestamp(entry['lastVisitTime']/1000).isoformat() + 'Z'
-            if current_timestamp > url_data[url]['timestamp']:
-                url_data[url]['timestamp'] = current_timestamp
-    
-    # Convert to list and sort by timestamp
-    processed_history = sorted(url_data.values(), key=lambda x: x['timestamp'], reverse=True)
-    
-    # Save to JSON file
-    output_path = os.path.join('processed_history', 'history_output.json')
-    os.makedirs('processed_history', exist_ok=True)
-    
-    with open(output_path, 'w') as f:
-        json.dump(processed_history, f, indent=2)
-    
-    print(f"Saved processed history to {os.path.abspath(output_path)}")
-    
-    return jsonify(processed_history)
+    """Merge posted history into the history store and queue new or changed URLs
+
+    The body is parsed as a stream and only URLs that are new or visited
+    since the last post are ingested. Responds with a compact summary and,
+    when there is work to do, the ingest job to poll.
+    """
+    changed = {}
+    def on_changed(url, last_visit_time):
+        changed[url] = visit_timestamp(last_visit_time)
+
+    summary, error = None, None
+    try:
+        summary = history_store.merge(iter_json_array(request.stream), on_changed=on_changed)
+    except ValueError as e:  # Includes UnicodeDecodeError
+        error = str(e)
+
+    # Entries merged before a malformed part of the body are still ingested
+    job = ingest_jobs.submit(list(changed), timestamps=changed,
+                             on_complete=lambda: store_contents(changed)) if changed else None
+    if error:
+        return jsonify({'error': error, 'merged': len(changed), 'job': job.to_dict() if job else None}), 400
+    summary['pages'] = len(history_store)
+    summary['job'] = job.to_dict() if job else None
+    return jsonify(summary), 202 if job else 200
+
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    return jsonify([job.to_dict() for job in ingest_jobs.jobs()])
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = ingest_jobs.get(job_id)
+    if not job:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    job = ingest_jobs.cancel(job_id)
+    if not job:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job.to_dict())
+
+class HistoryProcessor:
+    """Ingests and queries the history received from the browser extension"""
+
+    def __init__(self, browseiq_processor=None):
+        self.processor = browseiq_processor or processor
+
+    def history_urls(self):
+        """Stored history pages and their latest visit timestamps, most recent first"""
+        urls, timestamps = [], {}
+        for url, last_visit_time, _ in history_store.pages():
+            urls.append(url)
+            timestamps[url] = visit_timestamp(last_visit_time)
+        return urls, timestamps
+
+    def process_history(self):
+        """Queue every URL in the saved history for re-ingest, refreshing stale pages,
+        and copy their text into the history store once done; returns the job"""
+        urls, timestamps = self.history_urls()
+        return ingest_jobs.submit(urls, timestamps=timestamps,
+                                  on_complete=lambda: store_contents(urls, self.processor))
+
+    def query_history(self, question: str):
+        """Answer a question from the processed history, with source URLs"""
+        result = self.processor.query(question)
+        return {
+            'answer': result['answer'],
+            'source_documents': list(dict.fromkeys(
+                doc.metadata.get('source') for doc in result.get('source_documents', [])
+            ))
+        }
 
 if __name__ == '__main__':
     app.run(port=5000)
\ No newline at end of file
@@ -0,0 +1,191 @@
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+# backend/ holds the browseiq_common package shared with the MCP server
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.append(BACKEND_DIR)
+
+from browseiq_common.urls import canonicalize_url
+
+COUNTERS = ('fetched', 'skipped', 'failed', 'embedded', 'chunks')
+FINISHED_STATES = ('completed', 'failed', 'cancelled')
+# How often a job waiting on a coalesced job checks whether it was cancelled
+CANCEL_POLL_SECONDS = 0.1
+
+
+def _isoformat(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat() if timestamp else None
+
+
+class IngestJob:
+    """One submitted ingest run: its URLs, state and progress counters"""
+
+    def __init__(self, urls, timestamps=None, on_complete=None, coalesced_with=None):
+        self.id = uuid.uuid4().hex
+        self.urls = urls
+        self.timestamps = timestamps
+        self.on_complete = on_complete
+        # Earlier jobs already ingesting some of the submitted URLs -> how many of them
+        self.coalesced_with = dict(coalesced_with or {})
+        self.status = 'queued'
+        self.error = None
+        self.counts = dict.fromkeys(COUNTERS, 0)
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self.done = threading.Event()
+        self._lock = threading.Lock()
+
+    def record(self, counter: str, n: int = 1):
+        """Progress callback handed to BrowseIQProcessor.process_urls"""
+        with self._lock:
+            self.counts[counter] += n
+
+    def to_dict(self) -> dict:
+        """JSON-ready status, including throughput so far"""
+        with self._lock:
+            counts = dict(self.counts)
+        elapsed = ((self.finished_at or time.time()) - self.started_at) if self.started_at else 0.0
+        processed = counts['fetched'] + counts['failed']
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'total_urls': len(self.urls) + sum(self.coalesced_with.values()),
+            **counts,
+            'coalesced_with': list(self.coalesced_with),
+            'coalesced_urls': sum(self.coalesced_with.values()),
+            'error': self.error,
+            'submitted_at': _isoformat(self.submitted_at),
+            'started_at': _isoformat(self.started_at),
+            'finished_at': _isoformat(self.finished_at),
+            'elapsed_seconds': round(elapsed, 3),
+            'pages_per_second': round(processed / elapsed, 2) if elapsed else 0.0,
+            'chunks_per_second': round(counts['chunks'] / elapsed, 2) if elapsed else 0.0
+        }
+
+
+class IngestQueue:
+    """Runs ingest jobs for a BrowseIQProcessor on a small worker pool.
+
+    Submitting returns immediately with a job whose progress can be polled.
+    URLs already queued or running in another job are not submitted again:
+    the new job records that job in ``coalesced_with`` and only finishes
+    once it has, and resubmitting exactly the URLs of one pending job
+    returns that job. A job's ``total_urls`` includes its coalesced URLs,
+    which count as skipped once the job ingesting them completes.
+    """
+
+    def __init__(self, processor, max_workers: int = 2, max_finished: int = 100):
+        self.processor = processor
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ingest')
+        self._jobs = OrderedDict()
+        self._inflight = {}  # canonical URL -> id of the job ingesting it
+        self._lock = threading.Lock()
+
+    def submit(self, urls, timestamps=None, on_complete=None) -> IngestJob:
+        """Queue URLs for ingest and return the job tracking them
+
+        ``on_complete()`` runs in the worker once the job's URLs, including
+        coalesced ones, are ingested (not when the job fails or is cancelled).
+        A job fails if a job it coalesced URLs into does not complete.
+        """
+        with self._lock:
+            new_urls, coalesced_urls = {}, {}
+            for url in urls:
+                key = canonicalize_url(url)
+                if key in self._inflight:
+                    coalesced_urls[key] = self._inflight[key]
+                else:
+                    new_urls.setdefault(key, url)
+            coalesced = Counter(coalesced_urls.values())
+            if not new_urls and len(coalesced) == 1 and on_complete is None:
+                return self._jobs[next(iter(coalesced))]
+
+            job = IngestJob(list(new_urls.values()), timestamps, on_complete, coalesced)
+            for key in new_urls:
+                self._inflight[key] = job.id
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str):
+        """Return a job by ID, or None"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        """All tracked jobs, oldest first"""
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id: str):
+        """Cancel a queued or running job, returning it (None if unknown)
+
+        A running job stops between fetches and index batches; pages already
+        indexed stay indexed.
+        """
+        job = self.get(job_id)
+        if job and job.status not in FINISHED_STATES:
+            job.cancel_event.set()
+        return job
+
+    def _run(self, job: IngestJob):
+        try:
+            if job.cancel_event.is_set():
+                job.status = 'cancelled'
+                return
+            job.status = 'running'
+            job.started_at = time.time()
+            if job.urls:
+                self.processor.process_urls(job.urls, timestamps=job.timestamps,
+                                            progress=job.record, cancel=job.cancel_event)
+            self._release(job)
+            # Earlier jobs always started first, so waiting on them cannot deadlock the pool
+            for other_id, url_count in job.coalesced_with.items():
+                other = self.get(other_id)
+                if other:
+                    # Wait in short steps, so cancelling this job does not wait for the other one
+                    while not (other.done.wait(CANCEL_POLL_SECONDS) or job.cancel_event.is_set()):
+                        pass
+                    if job.cancel_event.is_set():
+                        break
+                    if other.status != 'completed':
+                        # Some of this job's URLs were left to that job and not ingested
+                        raise RuntimeError(f"Coalesced job {other_id} {other.status}")
+                job.record('skipped', url_count)
+            if job.cancel_event.is_set():
+                job.status = 'cancelled'
+                return
+            if job.on_complete:
+                job.on_complete()
+            job.status = 'completed'
+        except Exception as e:
+            print(f"Ingest job {job.id} failed: {e}")
+            job.status = 'failed'
+            job.error = str(e)
+        finally:
+            self._release(job)
+            job.finished_at = time.time()
+            job.done.set()
+
+    def _release(self, job: IngestJob):
+        with self._lock:
+            for url in job.urls:
+                key = canonicalize_url(url)
+                if self._inflight.get(key) == job.id:
+                    del self._inflight[key]
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED_STATES]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
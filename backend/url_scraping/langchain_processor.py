@@ -1,60 +1,103 @@
 # Update these imports
-from langchain_community.document_loaders import WebBaseLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain.schema import Document
 from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import OpenAIEmbeddings
 from langchain_community.chat_models import ChatOpenAI
 from langchain.chains import ConversationalRetrievalChain
+from langchain.retrievers import EnsembleRetriever
 from langchain.memory import ConversationBufferMemory
 from dotenv import load_dotenv
 import os
+import sys
+import asyncio
 import hashlib
+import multiprocessing
 import re
-from urllib.parse import urlparse
-import requests
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import parse_qs, urlparse
 from bs4 import BeautifulSoup
-import time
+from crawler import AsyncCrawler, interleave_hosts, page_text
+from extractor import extract_text
+import page_pipeline
+from fetch_cache import FetchCache
+from embedding_backends import create_embeddings
+from bm25_index import BM25Index, BM25Retriever
+from near_duplicates import NearDuplicateIndex
+from politeness import HostScheduler, RobotsCache
+
+# backend/ holds the browseiq_common package shared with the MCP server
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.append(BACKEND_DIR)
+
+from browseiq_common.urls import canonicalize_url, is_valid_url
 
 load_dotenv()
 
 class BrowseIQProcessor:
-    def __init__(self):
-        self.embeddings = OpenAIEmbeddings()
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200
-        )
+    def __init__(self, concurrency=32, per_host_concurrency=4, timeout=15.0, cache_ttl=24 * 60 * 60,
+                 embedding_backend=None, parse_workers=None, respect_robots=False):
+        # Cached embeddings: only chunks never seen before reach the backend
+        self.embedding_backend = embedding_backend or os.getenv("BROWSEIQ_EMBEDDINGS", "openai")
+        self.embeddings = create_embeddings(self.embedding_backend)
+        self.text_splitter = page_pipeline.text_splitter()
         self.llm = ChatOpenAI(temperature=0.7)
+        # Separate tagged client for the answer step so its tokens can be
+        # told apart from the question-rephrasing step when streaming
+        self.answer_llm = ChatOpenAI(temperature=0.7, streaming=True, tags=["answer"])
         self.memory = ConversationBufferMemory(
             memory_key="chat_history",
+            output_key="answer",
             return_messages=True
         )
-        self.vector_store = None
-        self.url_content_map = {}
+        # Persistent collection, opened once and updated in place
+        # (one collection per embedding backend, as vector sizes differ)
+        self.vector_store = Chroma(
+            collection_name="langchain" if self.embedding_backend == "openai" else f"langchain_{self.embedding_backend}",
+            embedding_function=self.embeddings,
+            persist_directory="./chroma_db"
+        )
+        self.rag_chain = None
         self.content_dir = "url_contents"
-        
-        # Create content directory if it doesn't exist
-        if not os.path.exists(self.content_dir):
-            os.makedirs(self.content_dir)
+        self.concurrency = concurrency
+        self.per_host_concurrency = per_host_concurrency
+        self.timeout = timeout
+
+        # Persistent, content-addressed page cache (creates content_dir)
+        self.fetch_cache = FetchCache(self.content_dir, ttl_seconds=cache_ttl)
+
+        # Local keyword index, backfilled from cached pages on first use
+        self.keyword_index = BM25Index(self.content_dir)
+        if not len(self.keyword_index) and self.fetch_cache.paths():
+            self.rebuild_keyword_index()
+
+        # MinHash LSH over page text, so near-identical pages share one set of embeddings
+        self.near_duplicates = NearDuplicateIndex(self.content_dir)
+
+        # Ingest jobs may run side by side; their index writes take turns
+        self._index_lock = threading.Lock()
+
+        # Parsing and chunking run in worker processes, started on first ingest
+        self.parse_workers = parse_workers or os.cpu_count() or 1
+        self._parse_pool = None
+        self._parse_pool_lock = threading.Lock()
+
+        # Host pacing and circuit breakers outlive a single crawl, so a dead
+        # host stays skipped across ingest jobs until its cooldown passes
+        self.host_scheduler = HostScheduler()
+        self.robots_cache = RobotsCache(self.content_dir) if respect_robots else None
+
+    @property
+    def url_content_map(self) -> dict:
+        """Map of every cached URL to the text file holding its content"""
+        return self.fetch_cache.paths()
 
     def is_valid_url(self, url: str) -> bool:
         """Validate URL format and scheme"""
-        try:
-            result = urlparse(url)
-            return all([result.scheme in ['http', 'https'], result.netloc])
-        except:
-            return False
+        return is_valid_url(url)
 
-    def sanitize_filename(self, url: str) -> str:
-        """Create a safe filename from URL"""
-        # Create a hash of the URL for a unique, safe filename
-        url_hash = hashlib.sha256(url.encode()).hexdigest()[:16]
-        return f"url_content_{url_hash}.txt"
-
-    def extract_content(self, url: str) -> str:
-        """Safely extract content from URL with error handling"""
-        # First try our standalone function for Google searches
-        from urllib.parse import parse_qs, urlparse
+    def search_content(self, url: str) -> str:
+        """Return the search terms of a Google search URL, or "" for other URLs"""
         if 'google.com/search' in url or 'google.com?q=' in url:
             try:
                 parsed = urlparse(url)
@@ -65,115 +108,427 @@ class BrowseIQProcessor:
                     return f"Google search: {search_terms}"
             except Exception as e:
                 print(f"Error parsing Google URL: {e}")
-        
+        return ""
+
+    async def afetch_page(self, crawler: AsyncCrawler, url: str):
+        """Fetch a URL through the fetch cache, returning (content, page)
+
+        ``page`` is the raw crawler result when its body still has to be
+        parsed (then pass the text to store_parsed), or None when
+        ``content`` is final: fresh or unchanged cache entries, Google
+        search terms and failures. Stale entries are revalidated with a
+        conditional GET.
+        """
+        entry = self.fetch_cache.get(url)
+        if entry and self.fetch_cache.is_fresh(entry):
+            return self.fetch_cache.read(entry), None
+
+        # Google searches are answered from the URL itself
+        search_terms = self.search_content(url)
+        if search_terms:
+            self.fetch_cache.put(url, search_terms)
+            return search_terms, None
+
+        page = await crawler.fetch(url, headers=self.fetch_cache.conditional_headers(entry))
+        etag = page['headers'].get('etag')
+        last_modified = page['headers'].get('last-modified')
+        if entry and page['status'] == 304:
+            self.fetch_cache.touch(url, etag, last_modified)
+            return self.fetch_cache.read(entry), None
+
+        # Check if this is a search engine result page
+        if not page['error'] and 'google.com/search' in page['final_url']:
+            # Extract actual result links from search page
+            soup = BeautifulSoup(page_text(page), 'html.parser')
+            result_links = [a['href'] for a in soup.select('a[href^="/url?"]')
+                            if 'url=' in a['href']]
+
+            if result_links:
+                # Get content from first result
+                first_result = result_links[0].split('url=')[1].split('&')[0]
+                page = await crawler.fetch(first_result)
+
+        if page['error']:
+            print(f"Error extracting content from {url}: {page['error']}")
+            # Serve the stale copy rather than nothing
+            return (self.fetch_cache.read(entry) if entry else ""), None
+
+        # Servers without validators may still send an identical body
+        page['body_hash'] = hashlib.sha256(page['content']).hexdigest()
+        if entry and entry['body_hash'] == page['body_hash']:
+            self.fetch_cache.touch(url, etag, last_modified)
+            return self.fetch_cache.read(entry), None
+        return "", page
+
+    def store_parsed(self, url: str, content: str, page: dict) -> str:
+        """Cache the text parsed from a page returned by afetch_page"""
+        if content:
+            self.fetch_cache.put(url, content, page['body_hash'],
+                                 page['headers'].get('etag'), page['headers'].get('last-modified'))
+        return content
+
+    def crawler(self, per_host_delay=0.0, decode_text=True) -> AsyncCrawler:
+        """A crawler sharing this processor's limits, host scheduler and robots cache"""
+        return AsyncCrawler(
+            concurrency=self.concurrency,
+            per_host_concurrency=self.per_host_concurrency,
+            timeout=self.timeout,
+            per_host_delay=per_host_delay,
+            decode_text=decode_text,
+            scheduler=self.host_scheduler,
+            robots_cache=self.robots_cache
+        )
+
+    async def aextract_content(self, url: str) -> str:
+        """Extract content from one URL through the fetch cache, as ingest does"""
+        async with self.crawler() as crawler:
+            content, page = await self.afetch_page(crawler, url)
+        if page is None:
+            return content
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.5'
-            }
-            
-            # Follow redirects and get final URL
-            session = requests.Session()
-            response = session.get(url, headers=headers, timeout=15, verify=True, allow_redirects=True)
-            
-            # Check if this is a search engine result page
-            if 'google.com/search' in response.url:
-                # Extract actual result links from search page
-                soup = BeautifulSoup(response.text, 'html.parser')
-                result_links = [a['href'] for a in soup.select('a[href^="/url?"]') 
-                              if 'url=' in a['href']]
-                
-                if result_links:
-                    # Get content from first result
-                    first_result = result_links[0].split('url=')[1].split('&')[0]
-                    response = session.get(first_result, headers=headers, timeout=15, verify=True)
-            
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Remove script and style elements
-            for script in soup(["script", "style"]):
-                script.decompose()
-                
-            # Get text content
-            text = soup.get_text(separator='\n', strip=True)
-            
-            # Clean up text
-            lines = [line.strip() for line in text.splitlines() if line.strip()]
-            return '\n'.join(lines)
+            content = extract_text(page_text(page))
         except Exception as e:
             print(f"Error extracting content from {url}: {e}")
             return ""
+        return self.store_parsed(url, content, page)
 
-    def process_urls(self, urls, batch_size=5, delay_seconds=1):
-        """Process URLs and store content in text files"""
-        documents = []
-        
-        for i, url in enumerate(urls):
-            if not self.is_valid_url(url):
-                continue
-                
-            try:
-                content = self.extract_content(url)
+    def extract_content(self, url: str) -> str:
+        """Safely extract content from URL with error handling (see aextract_content)"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.aextract_content(url))
+        # asyncio.run cannot nest inside a running loop, so use a loop of its own
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, self.aextract_content(url)).result()
+
+    def build_document(self, url: str, content: str, timestamp: str = None) -> Document:
+        """Wrap already extracted content in a Document keyed by canonical URL"""
+        return page_pipeline.build_document(url, content, timestamp)
+
+    def parse_pool(self) -> ProcessPoolExecutor:
+        """Process pool for the parse/chunk stage, started on first use"""
+        with self._parse_pool_lock:
+            if self._parse_pool is None:
+                # fork starts workers cheaply without re-running the importing
+                # script; platforms without it fall back to their default
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+                self._parse_pool = ProcessPoolExecutor(max_workers=self.parse_workers, mp_context=context)
+            return self._parse_pool
+
+    async def aingest(self, urls: dict, timestamps: dict, batch_size=5, per_host_delay=0.0,
+                      progress=None, cancel=None):
+        """Fetch, parse and index pages as three concurrent stages
+
+        ``urls`` maps canonical URLs to the URL to fetch. Fetching runs on the
+        event loop, decoding, extraction and chunking in the process pool and
+        indexing in a thread. Bounded queues between the stages hold at most
+        a few pages per parse worker, so memory stays flat however many URLs
+        are submitted, and a slow stage holds back the ones before it.
+        """
+        loop = asyncio.get_running_loop()
+        pool = self.parse_pool()
+        parse_queue = asyncio.Queue(maxsize=2 * self.parse_workers)
+        index_queue = asyncio.Queue(maxsize=2 * self.parse_workers)
+        canonical = {fetch_url: url for url, fetch_url in urls.items()}
+        pending = iter(interleave_hosts(canonical))
+        crawler = self.crawler(per_host_delay, decode_text=False)
+
+        async def fetch_stage():
+            # Fetchers share one iterator, so each URL is taken exactly once
+            for fetch_url in pending:
+                url = canonical[fetch_url]
+                try:
+                    content, page = await self.afetch_page(crawler, fetch_url)
+                except Exception as e:
+                    print(f"Error extracting content from {fetch_url}: {e}")
+                    content, page = "", None
+                await parse_queue.put((url, content, page))
+
+        async def parse_stage():
+            while True:
+                item = await parse_queue.get()
+                if item is None:
+                    return
+                url, content, page = item
+                prepared = None
+                try:
+                    if page is not None:
+                        content, content_hash, chunks, minhash = await loop.run_in_executor(
+                            pool, page_pipeline.parse_page, url, page['content'], page['encoding'], timestamps.get(url)
+                        )
+                        self.store_parsed(url, content, page)
+                        prepared = (content_hash, chunks, minhash)
+                except Exception as e:
+                    print(f"Error extracting content from {url}: {e}")
+                    content = ""
+                if progress:
+                    progress('fetched' if content else 'failed')
                 if not content:
                     print(f"Skipping {url} - no content available")
+                await index_queue.put((url, content, prepared))
+
+        async def index_stage():
+            documents, prepared = [], {}
+            while True:
+                item = await index_queue.get()
+                if item is not None:
+                    url, content, parsed = item
+                    if content:
+                        documents.append(self.build_document(url, content, timestamps.get(url)))
+                        if parsed:
+                            prepared[url] = parsed
+                if documents and (item is None or len(documents) >= batch_size):
+                    if cancel is None or not cancel.is_set():
+                        try:
+                            await asyncio.to_thread(self.index_documents, documents, progress, prepared)
+                        except Exception as e:
+                            print(f"Error indexing batch ending at {documents[-1].metadata['url']}: {e}")
+                    documents, prepared = [], {}
+                if item is None:
+                    return
+
+        async with crawler:
+            fetchers = [asyncio.ensure_future(fetch_stage()) for _ in range(max(1, min(self.concurrency, len(urls))))]
+            parsers = [asyncio.ensure_future(parse_stage()) for _ in range(self.parse_workers)]
+            indexer = asyncio.ensure_future(index_stage())
+
+            async def watch_cancel():
+                # Fetchers mostly wait on the crawler's semaphores, so
+                # cancelling them is the only way to stop the crawl promptly
+                while not cancel.is_set():
+                    await asyncio.sleep(0.1)
+                for task in fetchers:
+                    task.cancel()
+            watcher = asyncio.ensure_future(watch_cancel()) if cancel is not None else None
+            try:
+                await asyncio.gather(*fetchers, return_exceptions=True)
+            finally:
+                if watcher:
+                    watcher.cancel()
+            # Drain the later stages, then stop them
+            for _ in parsers:
+                await parse_queue.put(None)
+            await asyncio.gather(*parsers)
+            await index_queue.put(None)
+            await indexer
+
+    def process_urls(self, urls, batch_size=5, delay_seconds=1, timestamps=None, progress=None, cancel=None):
+        """Process URLs and store content in text files
+
+        Pages are fetched concurrently and parsed and chunked in a process
+        pool while earlier batches are embedded (see aingest);
+        ``delay_seconds`` is applied per host rather than globally, so
+        unrelated sites are never held up.
+        ``timestamps`` optionally maps URLs to their visit time for metadata.
+        URLs that canonicalize to the same page are fetched and indexed once.
+        ``progress(counter, n=1)`` receives "fetched", "failed", "skipped",
+        "embedded" and "chunks" counts as work completes; setting the
+        ``cancel`` event stops the run between fetches and batches.
+        """
+        # Collapse tracking-parameter and host variants before any network work
+        canonical_urls = {}
+        submitted = 0
+        for url in urls:
+            submitted += 1
+            if self.is_valid_url(url):
+                canonical_urls.setdefault(canonicalize_url(url), url)
+        if progress and submitted > len(canonical_urls):
+            progress('skipped', submitted - len(canonical_urls))
+        latest = {}
+        for url, timestamp in (timestamps or {}).items():
+            key = canonicalize_url(url)
+            latest[key] = max(timestamp, latest.get(key, timestamp))
+
+        asyncio.run(self.aingest(canonical_urls, latest, batch_size=batch_size, per_host_delay=delay_seconds,
+                                 progress=progress, cancel=cancel))
+
+    def chunk_id(self, url: str, chunk: str) -> str:
+        """Stable vector-store ID for a chunk of a URL's content"""
+        return page_pipeline.chunk_id(url, chunk)
+
+    def split_page(self, doc: Document, page_hash: str):
+        """Split a page into (chunk_id, chunk) pairs, dropping repeated chunks"""
+        return page_pipeline.split_page(doc, page_hash, self.text_splitter)
+
+    def index_documents(self, documents, progress=None, prepared=None) -> int:
+        """Upsert page documents into the vector store and keyword index,
+        returning the number of chunks embedded
+
+        Pages whose content hash is already stored are skipped. Pages that
+        nearly duplicate an already embedded page are linked to it instead of
+        being embedded; when that page changes, its duplicates are indexed
+        again from the fetch cache. For changed pages only new chunks are
+        embedded, chunks that are still present just get their metadata
+        refreshed, and chunks that disappeared are deleted. ``progress`` is
+        called as in process_urls. ``prepared`` optionally maps URLs to the
+        (page hash, chunks, MinHash) the parse stage already computed for them.
+        """
+        with self._index_lock:
+            documents = {doc.metadata['url']: doc for doc in documents}
+            if not documents:
+                return 0
+
+            stored_ids = {url: set() for url in documents}
+            stored_hashes = {url: set() for url in documents}
+            existing = self.vector_store.get(
+                where={'url': {'$in': list(documents)}},
+                include=['metadatas']
+            )
+            for chunk_id, metadata in zip(existing['ids'], existing['metadatas']):
+                stored_ids[metadata['url']].add(chunk_id)
+                stored_hashes[metadata['url']].add(metadata.get('page_hash'))
+
+            new_chunks, new_ids = [], []
+            kept_ids, kept_metadatas = [], []
+            stale_ids = []
+            keyword_changed = False
+            embedded_pages = 0
+            # Pages unlinked from a changed canonical page join the queue once more
+            pending, requeued = list(documents), set()
+
+            def requeue(urls):
+                for duplicate in urls:
+                    if duplicate in requeued or duplicate in pending:
+                        continue
+                    if duplicate not in documents:
+                        content = self.get_url_content(duplicate)
+                        if not content:
+                            continue
+                        documents[duplicate] = self.build_document(duplicate, content)
+                        stored_ids[duplicate], stored_hashes[duplicate] = set(), set()
+                    requeued.add(duplicate)
+                    pending.append(duplicate)
+
+            while pending:
+                url = pending.pop(0)
+                doc = documents[url]
+                report = progress if url not in requeued else None
+                page_hash, chunks, minhash = ((prepared or {}).get(url)
+                                              or (page_pipeline.page_hash(doc.page_content), None, None))
+                vector_current = (stored_hashes[url] == {page_hash}
+                                  or self.near_duplicates.linked_hash(url) == page_hash)
+                keyword_current = self.keyword_index.page_hash(url) == page_hash
+                if vector_current and keyword_current:
+                    if report:
+                        report('skipped')
                     continue
-                
-                # Save content to file
-                filename = self.sanitize_filename(url)
-                filepath = os.path.join(self.content_dir, filename)
-                
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    f.write(content)
-                
-                self.url_content_map[url] = filepath
-                
-                # Process for vector store in batches
-                loader = WebBaseLoader(url)
-                documents.extend(loader.load())
-                
-                # Process batch and add delay
-                if (i+1) % batch_size == 0 or i == len(urls)-1:
-                    if documents:
-                        splits = self.text_splitter.split_documents(documents)
-                        self.vector_store = Chroma.from_documents(
-                            documents=splits,
-                            embedding=self.embeddings,
-                            persist_directory="./chroma_db"
-                        )
-                        documents = []  # Reset for next batch
-                        time.sleep(delay_seconds)  # Add delay between batches
-            
+
+                if chunks is None:
+                    chunks = self.split_page(doc, page_hash)
+                if not keyword_current:
+                    self.keyword_index.replace_page(url, page_hash, chunks)
+                    keyword_changed = True
+                if vector_current:
+                    if report:
+                        report('skipped')
+                    continue
+
+                signature, shingles = minhash or self.near_duplicates.signature(doc.page_content)
+                duplicate_of = self.near_duplicates.find(url, signature, shingles)
+                if duplicate_of:
+                    requeue(self.near_duplicates.link(url, duplicate_of, page_hash))
+                    stale_ids.extend(stored_ids[url])
+                    stored_ids[url], stored_hashes[url] = set(), set()
+                    if report:
+                        report('skipped')
+                    continue
+                requeue(self.near_duplicates.add(url, signature, shingles))
+                if report:
+                    embedded_pages += 1
+
+                page_ids = set()
+                for chunk_id, chunk in chunks:
+                    page_ids.add(chunk_id)
+                    if chunk_id in stored_ids[url]:
+                        kept_ids.append(chunk_id)
+                        kept_metadatas.append(chunk.metadata)
+                    else:
+                        new_ids.append(chunk_id)
+                        new_chunks.append(chunk)
+                stale_ids.extend(stored_ids[url] - page_ids)
+
+            if stale_ids:
+                self.vector_store.delete(ids=stale_ids)
+            if kept_ids:
+                self.update_chunk_metadata(kept_ids, kept_metadatas)
+            if new_chunks:
+                self.vector_store.add_documents(new_chunks, ids=new_ids)
+            if stale_ids or kept_ids or new_chunks or keyword_changed:
+                self.rag_chain = None  # Rebuilt against the updated index on next query
+            if progress and embedded_pages:
+                progress('embedded', embedded_pages)
+                progress('chunks', len(new_chunks))
+            return len(new_chunks)
+
+    def update_chunk_metadata(self, ids, metadatas):
+        """Replace the metadata of stored chunks without embedding them again"""
+        # LangChain's Chroma wrapper only updates whole documents, which re-embeds
+        # them, so this goes to the underlying collection; keep all such access here
+        self.vector_store._collection.update(ids=ids, metadatas=metadatas)
+
+    def rebuild_keyword_index(self):
+        """Index every cached page's text file in the keyword index"""
+        for url, filepath in self.url_content_map.items():
+            try:
+                with open(filepath, 'r', encoding='utf-8') as f:
+                    doc = self.build_document(url, f.read())
+                page_hash = page_pipeline.page_hash(doc.page_content)
+                self.keyword_index.replace_page(url, page_hash, self.split_page(doc, page_hash))
             except Exception as e:
-                print(f"Error processing {url}: {e}")
-                continue
+                print(f"Error indexing keywords for {url}: {e}")
+        self.rag_chain = None
+
+    def keyword_search(self, query: str, k: int = 4):
+        """Search processed content locally with BM25, returning (Document, score) pairs"""
+        return self.keyword_index.search(query, k)
 
     def get_url_content(self, url: str) -> str:
         """Safely retrieve content for a URL"""
-        if url in self.url_content_map and os.path.exists(self.url_content_map[url]):
-            try:
-                with open(self.url_content_map[url], 'r', encoding='utf-8') as f:
-                    return f.read()
-            except Exception as e:
-                print(f"Error reading content file for {url}: {e}")
-        return ""
+        entry = self.fetch_cache.get(url)
+        return self.fetch_cache.read(entry) if entry else ""
 
     def create_rag_chain(self):
-        """Create a RAG chain for querying the processed content"""
-        if not self.vector_store:
+        """Return the RAG chain for querying the processed content, building it once
+
+        The chain is reused across queries and only rebuilt after
+        index_documents has changed the index.
+        """
+        if self.rag_chain is not None:
+            return self.rag_chain
+        if not self.vector_store.get(limit=1, include=[])['ids'] and not len(self.keyword_index):
             raise ValueError("No documents have been processed yet")
 
-        return ConversationalRetrievalChain.from_llm(
-            llm=self.llm,
-            retriever=self.vector_store.as_retriever(),
+        # Fuse exact-term BM25 hits with semantic matches by reciprocal rank
+        retriever = EnsembleRetriever(
+            retrievers=[BM25Retriever(index=self.keyword_index), self.vector_store.as_retriever()],
+            weights=[0.5, 0.5]
+        )
+        self.rag_chain = ConversationalRetrievalChain.from_llm(
+            llm=self.answer_llm,
+            condense_question_llm=self.llm,
+            retriever=retriever,
             memory=self.memory,
             return_source_documents=True
         )
+        return self.rag_chain
 
     def query(self, question: str):
         """Query the RAG chain with a question"""
         chain = self.create_rag_chain()
         return chain({"question": question})
+
+    async def astream_query(self, question: str):
+        """Query the RAG chain, yielding ("token", text) as the answer is generated
+        and a final ("sources", [urls]) once it completes"""
+        chain = self.create_rag_chain()
+        async for event in chain.astream_events({"question": question}, version="v2"):
+            if event['event'] == 'on_chat_model_stream' and 'answer' in event.get('tags', []):
+                token = event['data']['chunk'].content
+                if token:
+                    yield "token", token
+            elif event['event'] == 'on_chain_end' and not event.get('parent_ids'):
+                documents = event['data']['output'].get('source_documents', [])
+                yield "sources", list(dict.fromkeys(doc.metadata.get('source') for doc in documents))
     
\ No newline at end of file
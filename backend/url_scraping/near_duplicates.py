@@ -0,0 +1,173 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r'\w+')
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+# Shingles permuted at once; bounds the temporaries to SIGNATURE_BLOCK x num_perm values
+SIGNATURE_BLOCK = 4096
+
+
+def shingles(text: str, size: int = 3) -> set:
+    """Word shingles of a text (the whole text when shorter than ``size`` words)"""
+    tokens = TOKEN_PATTERN.findall(text.lower())
+    if len(tokens) < size:
+        return {' '.join(tokens)} if tokens else set()
+    return {' '.join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+class MinHasher:
+    """MinHash signatures over word shingles from seeded universal hash functions"""
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        # a, b < 2**31 and 32-bit shingle hashes keep a * x + b within uint64
+        self.a = rng.randint(1, 1 << 31, size=num_perm).astype(np.uint64)
+        self.b = rng.randint(0, 1 << 31, size=num_perm).astype(np.uint64)
+        self.num_perm = num_perm
+
+    def signature(self, text: str):
+        """Return (signature, shingle count) for a text"""
+        features = shingles(text)
+        if not features:
+            return np.full(self.num_perm, MAX_HASH, dtype=np.uint64), 0
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(f.encode(), digest_size=4).digest(), 'big') for f in features),
+            dtype=np.uint64, count=len(features)
+        )
+        signature = np.full(self.num_perm, MAX_HASH, dtype=np.uint64)
+        for start in range(0, len(hashes), SIGNATURE_BLOCK):
+            permuted = np.outer(hashes[start:start + SIGNATURE_BLOCK], self.a)
+            permuted += self.b
+            permuted %= np.uint64(MERSENNE_PRIME)
+            permuted &= np.uint64(MAX_HASH)
+            np.minimum(signature, permuted.min(axis=0), out=signature)
+        return signature, len(features)
+
+
+class NearDuplicateIndex:
+    """MinHash LSH index of embedded pages, for spotting near-duplicate content.
+
+    Signatures are cut into ``bands`` bands whose hashes live in an indexed
+    table, so a lookup is one probe per band plus a signature comparison for
+    each candidate, however many pages are indexed. Candidates must reach an
+    estimated Jaccard similarity of ``threshold``; pages with fewer than
+    ``min_shingles`` shingles only match exact duplicates.
+    """
+
+    def __init__(self, content_dir: str = "url_contents", num_perm: int = 128, bands: int = 16,
+                 threshold: float = 0.8, min_shingles: int = 20):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.min_shingles = min_shingles
+        os.makedirs(content_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(content_dir, "near_duplicates.db"), check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS signatures (
+                url TEXT PRIMARY KEY,
+                signature BLOB NOT NULL,
+                shingles INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS bands (
+                band INTEGER NOT NULL,
+                key INTEGER NOT NULL,
+                url TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_bands_key ON bands(band, key);
+            CREATE INDEX IF NOT EXISTS idx_bands_url ON bands(url);
+            CREATE TABLE IF NOT EXISTS links (
+                url TEXT PRIMARY KEY,
+                canonical_url TEXT NOT NULL,
+                page_hash TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_links_canonical ON links(canonical_url);
+        """)
+        self._conn.commit()
+
+    def signature(self, text: str):
+        """Return (signature, shingle count) for a page's text"""
+        return self.hasher.signature(text)
+
+    def _band_keys(self, signature):
+        return [
+            int.from_bytes(hashlib.blake2b(signature[i * self.rows:(i + 1) * self.rows].tobytes(),
+                                           digest_size=8).digest(), 'big', signed=True)
+            for i in range(self.bands)
+        ]
+
+    def find(self, url: str, signature, shingle_count: int):
+        """Return the URL of an indexed page that ``url``'s content nearly duplicates, or None"""
+        keys = self._band_keys(signature)
+        long_text = shingle_count >= self.min_shingles
+        threshold = self.threshold if long_text else 1.0
+        with self._lock:
+            rows = self._conn.execute(
+                f"""SELECT url, signature, shingles FROM signatures WHERE url IN (
+                        SELECT url FROM bands WHERE {' OR '.join(['(band = ? AND key = ?)'] * self.bands)}
+                    ) AND url != ?""",
+                (*(value for pair in enumerate(keys) for value in pair), url)
+            ).fetchall()
+        best = None
+        for candidate, candidate_signature, candidate_shingles in rows:
+            if (candidate_shingles >= self.min_shingles) != long_text:
+                continue
+            similarity = float(np.mean(np.frombuffer(candidate_signature, dtype=np.uint64) == signature))
+            if similarity >= threshold and (best is None or similarity > best[0]):
+                best = (similarity, candidate)
+        return best[1] if best else None
+
+    def _unlink_duplicates(self, canonical_url: str):
+        """Drop the links to ``canonical_url``, returning the URLs that had them"""
+        rows = self._conn.execute("SELECT url FROM links WHERE canonical_url = ?", (canonical_url,)).fetchall()
+        self._conn.execute("DELETE FROM links WHERE canonical_url = ?", (canonical_url,))
+        return [row[0] for row in rows]
+
+    def add(self, url: str, signature, shingle_count: int):
+        """Record ``url`` as a canonical page with the given signature.
+
+        Returns the pages that were linked to an earlier, different version
+        of ``url``; they are unlinked, since their match no longer holds.
+        """
+        keys = self._band_keys(signature)
+        with self._lock, self._conn:
+            previous = self._conn.execute("SELECT signature FROM signatures WHERE url = ?", (url,)).fetchone()
+            unlinked = []
+            if previous is not None and previous[0] != signature.tobytes():
+                unlinked = self._unlink_duplicates(url)
+            self._conn.execute("DELETE FROM links WHERE url = ?", (url,))
+            self._conn.execute("DELETE FROM bands WHERE url = ?", (url,))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO signatures VALUES (?, ?, ?)",
+                (url, signature.tobytes(), shingle_count)
+            )
+            self._conn.executemany("INSERT INTO bands VALUES (?, ?, ?)",
+                                   [(band, key, url) for band, key in enumerate(keys)])
+        return unlinked
+
+    def link(self, url: str, canonical_url: str, page_hash: str):
+        """Record ``url`` (with content hash ``page_hash``) as a near-duplicate of ``canonical_url``.
+
+        Returns the pages that were linked to ``url``; they matched its
+        earlier content, not ``canonical_url``, so they are unlinked.
+        """
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM signatures WHERE url = ?", (url,))
+            self._conn.execute("DELETE FROM bands WHERE url = ?", (url,))
+            unlinked = self._unlink_duplicates(url)
+            self._conn.execute("INSERT OR REPLACE INTO links VALUES (?, ?, ?)", (url, canonical_url, page_hash))
+        return unlinked
+
+    def linked_hash(self, url: str):
+        """Content hash ``url`` was linked with, or None if it is not a duplicate"""
+        with self._lock:
+            row = self._conn.execute("SELECT page_hash FROM links WHERE url = ?", (url,)).fetchone()
+        return row[0] if row else None
@@ -0,0 +1,90 @@
+import hashlib
+import os
+import sys
+from datetime import datetime, timezone
+from langchain.schema import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from extractor import extract_text
+from near_duplicates import MinHasher
+
+# backend/ holds the browseiq_common package shared with the MCP server
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.append(BACKEND_DIR)
+
+from browseiq_common.urls import canonical_domain, canonicalize_url
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+
+_text_splitter = None
+_min_hasher = None
+
+
+def text_splitter() -> RecursiveCharacterTextSplitter:
+    """The splitter used for page chunks, created once per process"""
+    global _text_splitter
+    if _text_splitter is None:
+        _text_splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    return _text_splitter
+
+
+def min_hasher() -> MinHasher:
+    """The hasher for near-duplicate signatures (NearDuplicateIndex's defaults), created once per process"""
+    global _min_hasher
+    if _min_hasher is None:
+        _min_hasher = MinHasher()
+    return _min_hasher
+
+
+def build_document(url: str, content: str, timestamp: str = None) -> Document:
+    """Wrap already extracted content in a Document keyed by canonical URL"""
+    url = canonicalize_url(url)
+    return Document(
+        page_content=content,
+        metadata={
+            'source': url,
+            'url': url,
+            'timestamp': timestamp or datetime.now(timezone.utc).isoformat(),
+            'domain': canonical_domain(url)
+        }
+    )
+
+
+def page_hash(content: str) -> str:
+    """Content hash a page is indexed under"""
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def chunk_id(url: str, chunk: str) -> str:
+    """Stable vector-store ID for a chunk of a URL's content"""
+    url_hash = hashlib.sha256(url.encode()).hexdigest()[:16]
+    chunk_hash = hashlib.sha256(chunk.encode()).hexdigest()[:16]
+    return f"{url_hash}-{chunk_hash}"
+
+
+def split_page(doc: Document, content_hash: str, splitter=None):
+    """Split a page into (chunk_id, chunk) pairs, dropping repeated chunks"""
+    chunks = {}
+    for chunk in (splitter or text_splitter()).split_documents([doc]):
+        key = chunk_id(doc.metadata['url'], chunk.page_content)
+        if key not in chunks:
+            chunk.metadata['page_hash'] = content_hash
+            chunks[key] = chunk
+    return list(chunks.items())
+
+
+def parse_page(url: str, body: bytes, encoding: str = None, timestamp: str = None):
+    """Decode, extract and chunk a fetched page: the CPU-bound half of ingest.
+
+    Runs in a worker process, so it takes the raw body and returns only
+    picklable results: (text, page hash, [(chunk_id, chunk)], (MinHash
+    signature, shingle count)). The text is "" (with no chunks or
+    signature) when the page has no content.
+    """
+    content = extract_text(body.decode(encoding or 'utf-8', errors='replace'))
+    if not content:
+        return "", None, [], None
+    content_hash = page_hash(content)
+    chunks = split_page(build_document(url, content, timestamp), content_hash)
+    return content, content_hash, chunks, min_hasher().signature(content)
@@ -0,0 +1,164 @@
+import os
+import random
+import sqlite3
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.robotparser import RobotFileParser
+
+
+class TokenBucket:
+    """Token bucket that hands out reservations instead of blocking.
+
+    ``reserve()`` takes a token and returns how long the caller must wait
+    before using it, so concurrent callers are spaced ``1 / rate`` apart
+    once the ``capacity`` burst is spent.
+    """
+
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def reserve(self) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return max(0.0, -self.tokens / self.rate)
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: opens after ``threshold`` failures, then
+    lets a single probe through once ``cooldown`` seconds have passed"""
+
+    def __init__(self, threshold: int = 3, cooldown: float = 300.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        now = time.monotonic()
+        if now - self.opened_at < self.cooldown:
+            return False
+        # Restart the clock so at most one probe goes out per cooldown
+        self.opened_at = now
+        self.probing = True
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.probing or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+            self.probing = False
+
+
+class HostScheduler:
+    """Per-host request pacing and failure tracking, shared across crawls.
+
+    Each host gets a token bucket paced by the larger of the caller's delay
+    and the host's robots.txt crawl-delay, and a circuit breaker that makes
+    further requests fail fast once the host keeps timing out or erroring.
+    Safe to share between crawls running on different threads.
+    """
+
+    def __init__(self, failure_threshold: int = 3, cooldown: float = 300.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._buckets = {}
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, host: str, delay: float, burst: int = 1) -> float:
+        """Seconds to wait before the next request to ``host`` (0 without a delay)"""
+        if delay <= 0:
+            return 0.0
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None or bucket.rate != 1 / delay or bucket.capacity != burst:
+                bucket = self._buckets[host] = TokenBucket(1 / delay, burst)
+            return bucket.reserve()
+
+    def _breaker(self, host: str) -> CircuitBreaker:
+        if host not in self._breakers:
+            self._breakers[host] = CircuitBreaker(self.failure_threshold, self.cooldown)
+        return self._breakers[host]
+
+    def allow(self, host: str) -> bool:
+        """Whether a request to ``host`` may go ahead (False while its circuit is open)"""
+        with self._lock:
+            return self._breaker(host).allow()
+
+    def record_success(self, host: str):
+        with self._lock:
+            self._breaker(host).record_success()
+
+    def record_failure(self, host: str):
+        with self._lock:
+            self._breaker(host).record_failure()
+
+
+def retry_after_seconds(value):
+    """Seconds a Retry-After header value (delta-seconds or HTTP date) asks for, or None"""
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return float(value.strip())
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 10.0) -> float:
+    """Exponential backoff with full jitter for retry number ``attempt`` (0-based)"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class RobotsCache:
+    """robots.txt crawl-delays per host, cached in SQLite for ``ttl_seconds``"""
+
+    def __init__(self, content_dir: str = "url_contents", ttl_seconds: float = 24 * 60 * 60):
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(content_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(content_dir, "robots_cache.db"), check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS robots (
+                host TEXT PRIMARY KEY,
+                crawl_delay REAL,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def get(self, host: str):
+        """Return (found, crawl_delay) for a host; found is False when missing or expired"""
+        with self._lock:
+            row = self._conn.execute("SELECT crawl_delay, fetched_at FROM robots WHERE host = ?", (host,)).fetchone()
+        if not row or time.time() - row[1] >= self.ttl_seconds:
+            return False, None
+        return True, row[0]
+
+    def put(self, host: str, crawl_delay):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO robots VALUES (?, ?, ?)", (host, crawl_delay, time.time()))
+            self._conn.commit()
+
+
+def parse_crawl_delay(robots_txt: str, user_agent: str = '*'):
+    """Crawl-delay that robots.txt asks of ``user_agent`` (or of "*"), or None"""
+    parser = RobotFileParser()
+    parser.parse(robots_txt.splitlines())
+    delay = parser.crawl_delay(user_agent)
+    return float(delay) if delay is not None else None
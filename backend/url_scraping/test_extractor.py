@@ -0,0 +1,36 @@
+"""Regression tests for boilerplate stripping in extractor.extract_text."""
+import pytest
+
+import extractor
+
+
+@pytest.fixture(params=['lexbor', 'bs4'])
+def parser(request, monkeypatch):
+    if request.param == 'lexbor' and extractor.LexborHTMLParser is None:
+        pytest.skip("selectolax not installed")
+    if request.param == 'bs4':
+        monkeypatch.setattr(extractor, 'LexborHTMLParser', None)
+    return request.param
+
+
+def test_keeps_body_with_cookie_class(parser):
+    html = ('<html><head><title>Page 3</title></head>'
+            '<body class="cookies-accepted"><p>alpha beta</p></body></html>')
+    assert extractor.extract_text(html) == "Page 3\nalpha beta"
+
+
+def test_keeps_consent_wrapper_around_main(parser):
+    html = '<div id="cookie-consent-wrapper"><main>Real article text</main></div>'
+    assert extractor.extract_text(html) == "Real article text"
+
+
+def test_keeps_root_with_consent_class(parser):
+    html = '<html class="no-js consent-pending"><body><p>Hello there</p></body></html>'
+    assert extractor.extract_text(html) == "Hello there"
+
+
+def test_strips_banners_and_chrome(parser):
+    html = ('<body><nav>Menu</nav><div class="cookie-banner">We use cookies</div>'
+            '<p>Article</p><footer>Footer</footer></body>')
+    assert extractor.extract_text(html) == "Article"
+    assert "We use cookies" in extractor.extract_text(html, strip_boilerplate=False)